@@ -0,0 +1,34 @@
+"""Add indexes for keyset-paginated list filters
+
+Revision ID: 3c1f7a9e2b44
+Revises: ac5df30ed3a6
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9e2b44'
+down_revision: Union[str, None] = 'ac5df30ed3a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filter column first, id second, so "WHERE <filter> AND id > cursor ORDER BY id" is one range scan
+    op.create_index('ix_employees_dept_id_id', 'employees', ['dept_id', 'id'])
+    op.create_index('ix_reservations_employee_id_id', 'reservations', ['employee_id', 'id'])
+    # Same expressions as the date-range filter (work reservations only have work_date). Date-range pages
+    # still sort by id, so this only narrows the filter scan; their cost grows with the matching range
+    op.create_index('ix_reservations_dates', 'reservations',
+                    [sa.text('COALESCE(start_date, work_date)'), sa.text('COALESCE(end_date, work_date)')])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservations_dates', table_name='reservations')
+    op.drop_index('ix_reservations_employee_id_id', table_name='reservations')
+    op.drop_index('ix_employees_dept_id_id', table_name='employees')
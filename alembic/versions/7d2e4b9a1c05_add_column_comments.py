@@ -0,0 +1,40 @@
+"""Add column comments describing coded values
+
+Revision ID: 7d2e4b9a1c05
+Revises: 3c1f7a9e2b44
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e4b9a1c05'
+down_revision: Union[str, None] = '3c1f7a9e2b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The NL-to-SQL prompt renders these from the catalog, so keep them in sync with the data
+COLUMN_COMMENTS = [
+    ('reservations', 'reservation_type', '1: vacation, 2: sick leave, 3: work'),
+    ('reservations', 'start_date', 'first day of a vacation or sick leave; NULL for work reservations'),
+    ('reservations', 'end_date', 'last day of a vacation or sick leave; NULL for work reservations'),
+    ('reservations', 'work_date', 'day of a work reservation (reservation_type 3)'),
+    ('reservations', 'shift_start', 'shift start time of a work reservation'),
+    ('reservations', 'shift_end', 'shift end time of a work reservation'),
+    ('hiring_personal', 'gender', "'m' or 'f'"),
+    ('appointments', 'status', 'scheduled, pending, confirmed or cancelled'),
+]
+
+
+def upgrade() -> None:
+    for table, column, comment in COLUMN_COMMENTS:
+        op.alter_column(table, column, comment=comment)
+
+
+def downgrade() -> None:
+    for table, column, _ in COLUMN_COMMENTS:
+        op.alter_column(table, column, comment=None)
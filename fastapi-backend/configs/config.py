@@ -1,35 +1,6 @@
 # config.py
 
-# Define your database schemas here
-DATABASE_SCHEMAS = """
-CREATE TABLE IF NOT EXISTS employees (
-    id SERIAL PRIMARY KEY,
-    name VARCHAR(40) NOT NULL,
-    salary INT,
-    dept_id INT REFERENCES departments (id),
-    hiring_personal_id INT REFERENCES hiring_personal (id)
-)
-CREATE TABLE IF NOT EXISTS hiring_personal (
-    id SERIAL PRIMARY KEY,
-    name VARCHAR(255),
-    age INT,
-    gender CHAR
-)
-CREATE TABLE IF NOT EXISTS departments (
-    id SERIAL PRIMARY KEY,
-    name VARCHAR(30) UNIQUE
-)
-CREATE TABLE IF NOT EXISTS reservations (
-    id SERIAL PRIMARY KEY,
-    employee_id INT REFERENCES employees (id),
-    start_date DATE,
-    end_date DATE,
-    reservation_type INT CHECK (reservation_type IN (1, 2, 3)), -- 1: vacation, 2: sick leave, 3: work
-    shift_start TIME,
-    shift_end TIME,
-    work_date DATE
-)
-"""
+# Database schemas are introspected at runtime, see services/schema_registry.py
 
 # Define the prompt for generating SQL queries
 SQL_GENERATION_PROMPT = """
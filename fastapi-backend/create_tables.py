@@ -156,6 +156,19 @@ try:
     (3, 3, '2024-06-03', '09:00:00', '09:30:00');'''
     cur.execute(insert_script_schedules)
 
+    # Column comments: the NL-to-SQL prompt reads them from the catalog to explain coded values
+    comment_script = """
+    COMMENT ON COLUMN "reservations".reservation_type IS '1: vacation, 2: sick leave, 3: work';
+    COMMENT ON COLUMN "reservations".start_date IS 'first day of a vacation or sick leave; NULL for work reservations';
+    COMMENT ON COLUMN "reservations".end_date IS 'last day of a vacation or sick leave; NULL for work reservations';
+    COMMENT ON COLUMN "reservations".work_date IS 'day of a work reservation (reservation_type 3)';
+    COMMENT ON COLUMN "reservations".shift_start IS 'shift start time of a work reservation';
+    COMMENT ON COLUMN "reservations".shift_end IS 'shift end time of a work reservation';
+    COMMENT ON COLUMN "hiring_personal".gender IS '''m'' or ''f''';
+    COMMENT ON COLUMN "appointments".status IS 'scheduled, pending, confirmed or cancelled';
+    """
+    cur.execute(comment_script)
+
     conn.commit()
 
 except Exception as error:
@@ -1,4 +1,11 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.extensions
+from psycopg2 import pool
 from sqlalchemy.ext.declarative import declarative_base
 
 # Database Connection Parameters
@@ -10,12 +17,123 @@ db_params = {
     "port": 5432
 }
 
+# Connection pool settings (sized per worker process)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Checkout wait is kept short so an exhausted pool fails fast (callers map PoolError to 503)
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "2"))
+DB_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "3600"))
+
 Base = declarative_base()
 
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool with bounded waiting, health checks
+    and recycling of idle or long-lived connections
+    """
+
+    def __init__(self, minconn: int, maxconn: int, **params):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **params)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._created_at = {}
+        self._last_used = {}
+
+    def getconn(self, timeout: float = DB_POOL_TIMEOUT_SECONDS):
+        # ThreadedConnectionPool fails immediately when exhausted, so wait for a free slot first
+        if not self._slots.acquire(timeout=timeout):
+            raise pool.PoolError(f"No database connection free within {timeout}s (pool exhausted)")
+        try:
+            while True:
+                conn = self._pool.getconn()
+                if self._is_usable(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            with self._lock:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            self._created_at.clear()
+            self._last_used.clear()
+        self._pool.closeall()
+
+    def _is_usable(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            created_at = self._created_at.setdefault(id(conn), now)
+            last_used = self._last_used.get(id(conn), now)
+
+        if now - created_at > DB_POOL_MAX_LIFETIME_SECONDS or now - last_used > DB_POOL_MAX_IDLE_SECONDS:
+            return False
+
+        if now - last_used > DB_POOL_HEALTH_CHECK_SECONDS:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._last_used.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=True)
+        except psycopg2.Error:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, **db_params)
+    return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for the duration of the block"""
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
 # Database connection
 def get_db():
-    db = psycopg2.connect(**db_params)
-    try:
+    with connection() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -35,7 +35,40 @@ app.include_router(nl_query.router)
 app.include_router(weather_assistant.router)
 
 # Database connection setup and dependencies
-from db import get_db
+from db import get_db, close_pool
+from services.http_client import close_http_client
+from services.llm import close_client as close_llm_client
+from services import sql_cache, transcription
+
+@app.on_event("startup")
+async def warmup_whisper_model():
+    # Opt-in: workers that never see audio shouldn't pay for loading the model
+    if transcription.WHISPER_WARMUP:
+        await transcription.warmup()
+
+@app.on_event("startup")
+def load_sql_cache():
+    sql_cache.load()
+
+@app.on_event("shutdown")
+def save_sql_cache():
+    sql_cache.save()
+
+@app.on_event("shutdown")
+def shutdown_db_pool():
+    close_pool()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await close_http_client()
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    await close_llm_client()
+
+@app.on_event("shutdown")
+def shutdown_transcription_workers():
+    transcription.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
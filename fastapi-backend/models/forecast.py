@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+@dataclass(frozen=True)
+class ForecastSlot:
+    """
+    A single 3-hour entry of the OpenWeatherMap forecast
+    """
+    hour: int
+    temperature: float
+    feels_like: float
+    humidity: float
+    conditions: str
+    description: str
+    wind_speed: float
+    precipitation: float  # Rain + snow volume for the slot, in mm
+
+@dataclass
+class DailyForecast:
+    """
+    All slots for one calendar day plus precomputed daily aggregates
+    """
+    date: date
+    slots: List[ForecastSlot] = field(default_factory=list)
+    temp_min: float = 0.0
+    temp_max: float = 0.0
+    temp_mean: float = 0.0
+    precipitation_total: float = 0.0
+    wind_max: float = 0.0
+
+    def closest_to(self, hour: int = 12) -> ForecastSlot:
+        """Return the slot closest to the given hour (noon by default)"""
+        return min(self.slots, key=lambda slot: abs(slot.hour - hour))
+
+    def _summarize(self):
+        temperatures = [slot.temperature for slot in self.slots]
+        self.temp_min = min(temperatures)
+        self.temp_max = max(temperatures)
+        self.temp_mean = round(sum(temperatures) / len(temperatures), 2)
+        self.precipitation_total = round(sum(slot.precipitation for slot in self.slots), 2)
+        self.wind_max = max(slot.wind_speed for slot in self.slots)
+
+class ForecastIndex:
+    """
+    Date-indexed view of an OpenWeatherMap 5-day forecast, parsed once so
+    lookups by date don't have to re-walk the raw JSON
+    """
+
+    def __init__(self, days: Dict[date, DailyForecast]):
+        self.days = days
+
+    @classmethod
+    def from_openweathermap(cls, forecast_data: Dict[str, Any]) -> "ForecastIndex":
+        days: Dict[date, DailyForecast] = {}
+        for entry in forecast_data.get("list", []):
+            forecast_datetime = datetime.fromtimestamp(entry["dt"])
+            weather = entry["weather"][0]
+            slot = ForecastSlot(
+                hour=forecast_datetime.hour,
+                temperature=entry["main"]["temp"],
+                feels_like=entry["main"]["feels_like"],
+                humidity=entry["main"]["humidity"],
+                conditions=weather["main"],
+                description=weather["description"],
+                wind_speed=entry["wind"]["speed"],
+                precipitation=entry.get("rain", {}).get("3h", 0.0) + entry.get("snow", {}).get("3h", 0.0)
+            )
+            day = days.get(forecast_datetime.date())
+            if day is None:
+                day = days[forecast_datetime.date()] = DailyForecast(date=forecast_datetime.date())
+            day.slots.append(slot)
+
+        for day in days.values():
+            day._summarize()
+        return cls(days)
+
+    def day(self, target_date: date) -> Optional[DailyForecast]:
+        return self.days.get(target_date)
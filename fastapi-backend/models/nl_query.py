@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal
 
 class NLQueryRequest(BaseModel):
     """Request model for natural language query processing"""
     query: str = Field(..., description="Natural language query to process")
+    message_mode: Literal["auto", "llm", "template", "deferred", "none"] = Field(
+        "auto", description="How user_message is built; 'deferred' returns a message_id to fetch it from /message/{message_id}"
+    )
     
 class QueryResponse(BaseModel):
     """Response model with query results"""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Literal
 from datetime import date
 
 class WeatherDressRequest(BaseModel):
@@ -11,6 +11,7 @@ class WeatherDressRequest(BaseModel):
     date: str  # Format: YYYY-MM-DD
     occasion: Optional[str] = None
     preferences: Optional[str] = None
+    mode: Literal["llm", "fast"] = "llm"  # "fast" skips the LLM and uses the rule-based engine
 
 class WeatherDressResponse(BaseModel):
     """
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
 from db import get_db
+from services import pagination
 from models.department import Department
 
 router = APIRouter()
@@ -18,12 +20,11 @@ async def create_department(name: str, db=Depends(get_db)):
         return {"error": str(e)}
 
 @router.get("/departments/")
-async def read_departments(db=Depends(get_db)):
+async def read_departments(limit: int = Query(pagination.PAGE_DEFAULT_LIMIT, ge=1, le=pagination.PAGE_MAX_LIMIT),
+                           after: Optional[int] = None, db=Depends(get_db)):
     try:
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM departments")
-        departments = cursor.fetchall()
-        return {"departments": departments}
+        departments, next_cursor = pagination.fetch_page(db, "departments", after=after, limit=limit)
+        return {"departments": departments, "next_cursor": next_cursor}
     except Exception as e:
         return {"error": str(e)}
 
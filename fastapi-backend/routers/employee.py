@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
 from db import get_db
+from services import pagination
 from models.employee import Employee
 
 router = APIRouter()
@@ -19,12 +21,14 @@ async def create_employee(name: str, salary: int, dept_id: int, hiring_personal_
         return {"error": str(e)}
 
 @router.get("/employees/")
-async def read_employees(db=Depends(get_db)):
+async def read_employees(limit: int = Query(pagination.PAGE_DEFAULT_LIMIT, ge=1, le=pagination.PAGE_MAX_LIMIT),
+                         after: Optional[int] = None, dept_id: Optional[int] = None, db=Depends(get_db)):
     try:
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM employees")
-        employees = cursor.fetchall()
-        return {"employees": employees}
+        conditions = []
+        if dept_id is not None:
+            conditions.append(("dept_id = %s", dept_id))
+        employees, next_cursor = pagination.fetch_page(db, "employees", conditions, after, limit)
+        return {"employees": employees, "next_cursor": next_cursor}
     except Exception as e:
         return {"error": str(e)}
 
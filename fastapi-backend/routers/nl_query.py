@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
-from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, HTTPException, File, Header, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+import asyncio
 import logging
 import time
+import uuid
 import json
 import re
 import sys
@@ -9,16 +13,17 @@ import os
 from dotenv import load_dotenv
 import psycopg2
 import psycopg2.extras
+from psycopg2 import pool
 from datetime import datetime
-from openai import OpenAI
-from langchain_community.llms import OpenAI as LangchainOpenAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 
 # Fixed imports to get the actual classes instead of the module
 from models.nl_query import NLQueryRequest, QueryResponse
-from db import get_db
+from db import connection
 from configs import config
+from services import llm, schema_registry, semantic_cache, sql_cache, sql_guard, sql_templates, sql_validator, transcription
+from services.result_summary import summarize_results
+from services.cache import TTLCache
 
 load_dotenv()
 
@@ -30,146 +35,69 @@ log_formatter = logging.Formatter("%(asctime)s [%(processName)s: %(process)d] [%
 stream_handler.setFormatter(log_formatter)
 logger.addHandler(stream_handler)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Initialize LangChain OpenAI client
-langchain_openai = LangchainOpenAI(openai_api_key=OPENAI_API_KEY)
-
-# Database connection details
-POSTGRES_HOST = "localhost"
-POSTGRES_DBNAME = "postgres"
-POSTGRES_USER = "postgres"
-POSTGRES_PASSWORD = "mocAi"
-POSTGRES_PORT = 5432
-
-# Define the database schema for the LLM - using your provided schema
-DB_SCHEMA = """
-Available tables and their schemas:
-
-1. employees
-   - id (SERIAL): Primary key
-   - name (VARCHAR): Employee name
-   - salary (INTEGER): Employee salary
-   - dept_id (INTEGER): Foreign key referencing departments.id
-   - hiring_personal_id (INTEGER): Foreign key referencing hiring_personal.id
-
-2. hiring_personal
-   - id (SERIAL): Primary key
-   - name (VARCHAR): Person's name
-   - age (INTEGER): Person's age
-   - gender (CHAR): Person's gender ('m' or 'f')
-
-3. departments
-   - id (SERIAL): Primary key
-   - name (VARCHAR): Department name (unique)
-
-4. reservations
-   - id (SERIAL): Primary key
-   - employee_id (INTEGER): Foreign key referencing employees.id
-   - start_date (DATE): Reservation start date
-   - end_date (DATE): Reservation end date
-   - reservation_type (INTEGER): Type of reservation (1: vacation, 2: sick leave, 3: work)
-   - shift_start (TIME): Shift start time (for work reservations)
-   - shift_end (TIME): Shift end time (for work reservations)
-   - work_date (DATE): Work date (for work reservations)
-
-5. appointments
-   - appointment_id (SERIAL): Primary key
-   - employee_id (INTEGER): Foreign key referencing employees.id
-   - title (VARCHAR): Appointment title
-   - description (TEXT): Appointment description
-   - start_time (TIMESTAMP): Appointment start time
-   - end_time (TIMESTAMP): Appointment end time
-   - status (VARCHAR): Appointment status (e.g., pending, confirmed, cancelled)
-
-6. schedules
-   - schedule_id (SERIAL): Primary key
-   - employee_id (INTEGER): Foreign key referencing employees.id
-   - appointment_id (INTEGER): Foreign key referencing appointments.appointment_id
-   - date (DATE): Schedule date
-   - start_time (TIME): Schedule start time
-   - end_time (TIME): Schedule end time
-
-Relationships:
-- employees.dept_id references departments.id
-- employees.hiring_personal_id references hiring_personal.id
-- reservations.employee_id references employees.id
-- appointments.employee_id references employees.id
-- schedules.employee_id references employees.id
-- schedules.appointment_id references appointments.appointment_id
-"""
-
 router = APIRouter(
     prefix="/api/nl-query",
     tags=["natural-language-query"],
 )
 
-def connect_to_postgres():
-    """Establish a connection to PostgreSQL database"""
-    try:
-        conn = psycopg2.connect(
-            host=POSTGRES_HOST,
-            dbname=POSTGRES_DBNAME,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            port=POSTGRES_PORT
-        )
-        return conn
-    except psycopg2.Error as e:
-        raise HTTPException(status_code=500, detail=f"Error while connecting to PostgreSQL: {e}")
+# Results up to this many rows (single column) get a template message instead of an LLM call
+TEMPLATE_MESSAGE_MAX_ROWS = int(os.getenv("NL_QUERY_TEMPLATE_MESSAGE_MAX_ROWS", "10"))
+# How long a deferred message stays available to fetch
+DEFERRED_MESSAGE_TTL_SECONDS = float(os.getenv("NL_QUERY_DEFERRED_MESSAGE_TTL_SECONDS", "300"))
 
-def execute_query(query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+# Streaming results: rows fetched per server-side cursor round trip, and the default/maximum row cap
+STREAM_FETCH_SIZE = int(os.getenv("NL_QUERY_STREAM_FETCH_SIZE", "500"))
+STREAM_DEFAULT_MAX_ROWS = int(os.getenv("NL_QUERY_STREAM_DEFAULT_MAX_ROWS", "10000"))
+STREAM_MAX_ROWS_LIMIT = int(os.getenv("NL_QUERY_STREAM_MAX_ROWS_LIMIT", "1000000"))
+
+_deferred_messages = TTLCache(maxsize=1024, ttl=DEFERRED_MESSAGE_TTL_SECONDS)
+
+def validate_sql(query: str) -> str:
     """
-    Execute a SQL query and return results as a list of dictionaries
+    Validate a SQL query string that was generated by an LLM and return it stripped.
+    It must be a single read-only SELECT over the allowed tables.
     """
-    conn = None
-    cur = None
-    try:
-        conn = connect_to_postgres()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        return [dict(row) for row in results]
-    
-    except Exception as e:
-        logger.error(f"Database query error: {str(e)}")
-        raise
-    
-    finally:
-        if cur is not None:
-            cur.close()
-        if conn is not None:
-            conn.close()
+    query = query.strip()
+    analysis = sql_validator.analyze(query)
+    if not analysis.ok:
+        raise ValueError(analysis.error)
+    return query
 
 def execute_safe_sql(query: str) -> List[Dict[str, Any]]:
     """
-    Execute a SQL query string that was generated by an LLM
-    This performs basic validation to reduce SQL injection risks
+    Execute a SQL query string that was generated by an LLM, in a read-only
+    transaction with a statement timeout, a plan-cost check and a default LIMIT
     """
-    # Simple validation - restrict to SELECT queries only
-    query = query.strip()
-    if not query.lower().startswith("select "):
-        raise ValueError("Only SELECT queries are allowed for safety reasons")
-    
-    # Block multiple statements
-    if ";" in query[:-1]:  # Allow semicolon at the end
-        raise ValueError("Multiple SQL statements are not allowed")
+    query = sql_guard.with_limit(validate_sql(query))
+    with sql_guard.statement_timeouts(), connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            sql_guard.guard(cur, query)
+            cur.execute(query)
+            results = cur.fetchall()
     
-    # Block dangerous SQL commands
-    dangerous_keywords = ["drop", "delete", "update", "insert", "alter", "create", "truncate"]
-    for keyword in dangerous_keywords:
-        if f" {keyword} " in f" {query.lower()} ":
-            raise ValueError(f"Dangerous SQL keyword '{keyword}' is not allowed")
-    
-    # Execute the sanitized query
-    return execute_query(query)
+    return [dict(row) for row in results]
+
+def stream_query(query: str, max_rows: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yield up to max_rows rows of an already validated query through a
+    server-side cursor, so only one fetch batch is held in memory at a time.
+    The same read-only/timeout/plan-cost guard as execute_safe_sql applies,
+    to the query capped at max_rows so big scans that are only partly read
+    aren't rejected on their full row estimate.
+    """
+    query = sql_guard.with_limit(query, max_rows)
+    with sql_guard.statement_timeouts(), connection() as conn:
+        with conn.cursor() as cur:
+            sql_guard.guard(cur, query)
+        with conn.cursor(name=f"nl_query_{uuid.uuid4().hex}", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = STREAM_FETCH_SIZE
+            cur.execute(query)
+            for count, row in enumerate(cur):
+                if count >= max_rows:
+                    break
+                yield row
 
-def process_natural_language_query(query: str) -> str:
+async def process_natural_language_query(query: str) -> str:
     """
     Process a natural language query using LangChain to generate a SQL query
     """
@@ -195,11 +123,11 @@ def process_natural_language_query(query: str) -> str:
             """
         )
         
-        # Create LLM chain
-        sql_chain = LLMChain(llm=langchain_openai, prompt=sql_prompt_template)
+        # Only the tables the question is about go into the prompt
+        schema = await run_in_threadpool(schema_registry.get)
         
         # Generate SQL query
-        response = sql_chain.run({"schema": DB_SCHEMA, "query": query})
+        response = await llm.complete(sql_prompt_template.format(schema=schema.render(schema.relevant_tables(query)), query=query))
         
         # Extract SQL query from response
         sql_query = clean_sql_query(response)
@@ -211,6 +139,61 @@ def process_natural_language_query(query: str) -> str:
         logger.error(f"Error processing natural language query: {str(e)}", exc_info=True)
         raise Exception(f"Failed to process query: {str(e)}")
 
+async def translate_query(query: str) -> Tuple[str, str, Optional[List[float]]]:
+    """
+    Translate a natural language query to SQL. Previously validated
+    translations of the same question, or of a close paraphrase, are reused
+    without calling the LLM. Returns (sql_query, source, embedding), where
+    source is "cache", "semantic_cache" or "llm"; pass them to
+    remember_translation once the SQL has run.
+    """
+    schema_version = (await run_in_threadpool(schema_registry.get)).version
+    sql_query = sql_cache.get(sql_cache.cache_key(query, schema_version))
+    if sql_query is not None:
+        return sql_query, "cache", None
+
+    embedding = await semantic_cache.embed(query) if semantic_cache.NL_SEMANTIC_CACHE_ENABLED else None
+    if embedding is not None:
+        sql_query = semantic_cache.lookup(embedding, query, schema_version)
+        if sql_query is not None:
+            return sql_query, "semantic_cache", None
+
+    return await process_natural_language_query(query), "llm", embedding
+
+def remember_translation(query: str, sql_query: str, embedding: Optional[List[float]] = None):
+    """Cache SQL that passed validation and ran"""
+    schema_version = schema_registry.get().version
+    sql_cache.put(sql_cache.cache_key(query, schema_version), sql_query)
+    if embedding is not None:
+        semantic_cache.add(embedding, sql_query, schema_version)
+
+async def translate_and_execute(query: str) -> Tuple[str, List[Dict[str, Any]], str]:
+    """
+    Answer a natural language query. Common intents about a known department
+    or employee run as prepared SQL templates; anything else is translated
+    (cache, then LLM) and executed.
+    Returns (sql_query, results, source), where source is "template" or one
+    of the translate_query sources. Pool checkout and queries block, so they
+    run in the threadpool rather than on the event loop.
+    """
+    template_match = sql_templates.match(sql_cache.normalize_query(query))
+    if template_match is not None:
+        results = await run_in_threadpool(execute_template, template_match)
+        if results is not None:
+            return template_match.display_sql, results, "template"
+
+    sql_query, source, embedding = await translate_query(query)
+    results = await run_in_threadpool(execute_safe_sql, sql_query)
+    await run_in_threadpool(remember_translation, query, sql_query, embedding)
+    return sql_query, results, source
+
+def execute_template(template_match: sql_templates.TemplateMatch) -> Optional[List[Dict[str, Any]]]:
+    """Run a template match, or return None when it names no known department or employee"""
+    with connection() as conn:
+        if not sql_templates.accepts(conn, template_match):
+            return None
+        return sql_templates.execute(conn, template_match)
+
 def clean_sql_query(sql_response: str) -> str:
     """
     Clean up the SQL query returned from the LLM
@@ -238,7 +221,7 @@ def clean_sql_query(sql_response: str) -> str:
     
     return sql_query
 
-def generate_user_friendly_message(query: str, results: List[Dict[str, Any]]) -> str:
+async def generate_user_friendly_message(query: str, results: List[Dict[str, Any]]) -> str:
     """
     Generate a user-friendly message based on query results
     """
@@ -249,20 +232,17 @@ def generate_user_friendly_message(query: str, results: List[Dict[str, Any]]) ->
             template="""
             Based on the query: "{query}" 
             
-            And the following results: {results}
+            And the following summary of the results (row count, column statistics and sample rows): {results}
             
             Create a concise, user-friendly summary of the results. Format the response in a way that's easy to read.
             """
         )
         
-        # Create LLM chain
-        message_chain = LLMChain(llm=langchain_openai, prompt=message_prompt_template)
-        
-        # Generate user-friendly message
-        response = message_chain.run({
-            "query": query,
-            "results": json.dumps(results, default=str)
-        })
+        # Generate user-friendly message from a bounded digest rather than every row
+        response = await llm.complete(message_prompt_template.format(
+            query=query,
+            results=json.dumps(summarize_results(results), default=str)
+        ))
         
         return response.strip()
     
@@ -270,8 +250,46 @@ def generate_user_friendly_message(query: str, results: List[Dict[str, Any]]) ->
         logger.error(f"Error generating user-friendly message: {str(e)}", exc_info=True)
         return f"Here are the results: {results}"
 
+def template_message(query: str, results: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Build the user message locally for simple result shapes (no rows, a
+    single value, or a short single-column list). Returns None otherwise.
+    """
+    if not results:
+        return f'No results found for "{query}".'
+
+    columns = list(results[0].keys())
+    if len(columns) != 1 or len(results) > TEMPLATE_MESSAGE_MAX_ROWS:
+        return None
+
+    column = columns[0].replace("_", " ")
+    values = [str(row[columns[0]]) for row in results]
+    if len(values) == 1:
+        return f"The {column} is {values[0]}."
+    return f"Found {len(values)} results ({column}): {', '.join(values)}."
+
+async def build_user_message(query: str, results: List[Dict[str, Any]], mode: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Produce the user message for a result set according to the requested mode.
+    Returns (message, extra_metadata); the LLM is only called when needed.
+    """
+    if mode == "none":
+        return None, {"message_source": "none"}
+
+    if mode in ("auto", "template", "deferred"):
+        message = template_message(query, results)
+        if message is not None or mode == "template":
+            return message, {"message_source": "template"}
+
+    if mode == "deferred":
+        message_id = uuid.uuid4().hex
+        _deferred_messages.set(message_id, asyncio.ensure_future(generate_user_friendly_message(query, results)))
+        return None, {"message_source": "deferred", "message_id": message_id}
+
+    return await generate_user_friendly_message(query, results), {"message_source": "llm"}
+
 @router.post("/process", response_model=QueryResponse)
-async def process_query(request: NLQueryRequest, db=Depends(get_db)):
+async def process_query(request: NLQueryRequest):
     """
     Process a natural language query and return database results
     """
@@ -280,15 +298,12 @@ async def process_query(request: NLQueryRequest, db=Depends(get_db)):
     try:
         logger.info(f"Processing natural language query: {request.query}")
         
-        # Process the natural language query using LLM
-        sql_query = process_natural_language_query(request.query)
-        logger.info(f"Generated SQL query: {sql_query}")
-        
-        # Execute the query against the database
-        results = execute_safe_sql(sql_query)
+        # Translate (via the cache or the LLM) and execute the query against the database
+        sql_query, results, sql_source = await translate_and_execute(request.query)
+        logger.info(f"SQL query ({sql_source}): {sql_query}")
         
-        # Generate user-friendly message
-        friendly_message = generate_user_friendly_message(request.query, results)
+        # Generate the user-friendly message only as far as the requested mode needs it
+        friendly_message, message_metadata = await build_user_message(request.query, results, request.message_mode)
         
         # Calculate query execution time
         execution_time = time.time() - start_time
@@ -300,9 +315,14 @@ async def process_query(request: NLQueryRequest, db=Depends(get_db)):
             user_message=friendly_message,
             metadata={
                 "execution_time_seconds": round(execution_time, 3),
-                "row_count": len(results)
+                "row_count": len(results),
+                "sql_source": sql_source,
+                **message_metadata
             }
         )
+    except pool.PoolError as e:
+        logger.warning(f"Database pool exhausted: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
     except ValueError as e:
         # Handle validation errors (from execute_safe_sql)
         logger.warning(f"SQL query validation error: {str(e)}")
@@ -324,86 +344,139 @@ async def process_query(request: NLQueryRequest, db=Depends(get_db)):
             error=f"Failed to process query: {str(e)}"
         )
 
-@router.get("/schema", response_model=Dict[str, Any])
-async def get_database_schema():
+@router.post("/process/stream")
+async def process_query_stream(request: NLQueryRequest, max_rows: int = Query(STREAM_DEFAULT_MAX_ROWS, ge=1, le=STREAM_MAX_ROWS_LIMIT)):
     """
-    Get the database schema for reference
+    Process a natural language query and stream the results as NDJSON: a
+    {"sql_query": ...} header, one {"row": ...} line per row, then a closing
+    {"metadata": {"row_count": ..., "truncated": ...}} line. Rows come from a
+    server-side cursor, so memory stays flat whatever the result size.
     """
     try:
-        # Query to get table information using PostgreSQL's information_schema
-        tables_query = """
-        SELECT 
-            table_name,
-            column_name,
-            data_type,
-            is_nullable
-        FROM 
-            information_schema.columns
-        WHERE 
-            table_schema = 'public'
-        ORDER BY 
-            table_name, ordinal_position;
-        """
-        
-        # Execute the query
-        columns = execute_safe_sql(tables_query)
-        
-        # Organize the results by table
-        schema = {}
-        for column in columns:
-            table_name = column["table_name"]
-            if table_name not in schema:
-                schema[table_name] = []
-            
-            schema[table_name].append({
-                "column_name": column["column_name"],
-                "data_type": column["data_type"],
-                "is_nullable": column["is_nullable"]
-            })
-        
-        return {"tables": schema}
+        sql_query, sql_source, embedding = await translate_query(request.query)
+        sql_query = validate_sql(sql_query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Query validation failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
     
+    return StreamingResponse(
+        result_lines(request.query, sql_query, sql_source, embedding, max_rows),
+        media_type="application/x-ndjson"
+    )
+
+def ndjson_line(data: Any) -> str:
+    return json.dumps(data, default=str) + "\n"
+
+def result_lines(query: str, sql_query: str, sql_source: str, embedding: Optional[List[float]], max_rows: int) -> Iterator[str]:
+    # A plain generator: StreamingResponse iterates it in the threadpool, so blocking fetches stay off the event loop
+    start_time = time.time()
+    yield ndjson_line({"original_query": query, "sql_query": sql_query})
+    
+    row_count = 0
+    truncated = False
+    try:
+        # Ask for one extra row to know whether the cap cut the result short
+        for row in stream_query(sql_query, max_rows + 1):
+            if row_count == max_rows:
+                truncated = True
+                break
+            yield ndjson_line({"row": row})
+            row_count += 1
+    except Exception as e:
+        logger.error(f"Error streaming query results: {str(e)}", exc_info=True)
+        yield ndjson_line({"error": f"Failed to execute query: {str(e)}"})
+        return
+    
+    remember_translation(query, sql_query, embedding)
+    yield ndjson_line({"metadata": {
+        "execution_time_seconds": round(time.time() - start_time, 3),
+        "row_count": row_count,
+        "truncated": truncated,
+        "max_rows": max_rows,
+        "sql_source": sql_source
+    }})
+
+@router.get("/message/{message_id}")
+async def get_deferred_message(message_id: str):
+    """
+    Fetch the user-friendly message for a query processed with message_mode='deferred'
+    """
+    task = _deferred_messages.get(message_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Message not found or expired")
+    return {"message_id": message_id, "user_message": await asyncio.shield(task)}
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss metrics for the exact and semantic NL-to-SQL translation caches
+    """
+    return {
+        "sql": sql_cache.stats(),
+        "semantic": semantic_cache.stats()
+    }
+
+@router.get("/guard-stats")
+async def get_guard_stats():
+    """
+    Counts of LLM-generated queries checked, rejected for plan cost or row
+    estimate, and stopped by the statement timeout
+    """
+    return sql_guard.stats()
+
+@router.post("/schema/refresh")
+async def refresh_schema():
+    """
+    Re-check the database schema now instead of waiting for the next periodic
+    check, e.g. right after running a migration
+    """
+    schema_registry.invalidate()
+    schema = await run_in_threadpool(schema_registry.get)
+    return {"version": schema.version, "tables": list(schema.tables)}
+
+@router.get("/schema", response_model=Dict[str, Any])
+async def get_database_schema(if_none_match: Optional[str] = Header(None)):
+    """
+    Get the database schema for reference. Served from the schema registry
+    with an ETag of the schema version, so clients revalidating with
+    If-None-Match get a 304 until the schema changes.
+    """
+    try:
+        schema = await run_in_threadpool(schema_registry.get)
     except Exception as e:
         logger.error(f"Error fetching database schema: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to fetch database schema: {str(e)}")
+    
+    etag = f'"{schema.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse({"tables": schema.grouped}, headers=headers)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match holds "*" or a comma-separated list of (possibly weak) ETags"""
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
 
 @router.post("/transcribe-and-query", response_model=QueryResponse)
-async def transcribe_and_query(file: UploadFile = File(...), db=Depends(get_db)):
+async def transcribe_and_query(file: UploadFile = File(...)):
     """
     Transcribe audio file and process as a natural language query
     """
     try:
-        # Check if Whisper model is installed
-        import whisper
-        
-        # Save uploaded file temporarily
-        audio_file_path = f"temp_{int(time.time())}.wav"
-        with open(audio_file_path, "wb") as f:
-            f.write(await file.read())
-        
-        # Load audio and transcribe
-        model = whisper.load_model("base")
-        audio = whisper.load_audio(audio_file_path)
-        audio = whisper.pad_or_trim(audio)
-        mel = whisper.log_mel_spectrogram(audio).to(model.device)
-        
-        # Detect language and transcribe
-        _, probs = model.detect_language(mel)
-        detected_language = max(probs, key=probs.get)
-        options = whisper.DecodingOptions()
-        result = whisper.decode(model, mel, options)
-        
-        # Clean up temp file
-        os.remove(audio_file_path)
+        # Read the upload in memory (size-capped) and transcribe on the worker pool
+        audio_bytes = await transcription.read_upload(file)
+        transcribed_text, detected_language = await transcription.transcribe(audio_bytes)
         
         # Process the transcribed text as a natural language query
-        transcribed_text = result.text
         logger.info(f"Transcribed text: {transcribed_text}")
         
         # Process as a natural language query
-        sql_query = process_natural_language_query(transcribed_text)
-        results = execute_safe_sql(sql_query)
-        friendly_message = generate_user_friendly_message(transcribed_text, results)
+        sql_query, results, sql_source = await translate_and_execute(transcribed_text)
+        friendly_message, message_metadata = await build_user_message(transcribed_text, results, "auto")
         
         return QueryResponse(
             original_query=transcribed_text,
@@ -412,10 +485,19 @@ async def transcribe_and_query(file: UploadFile = File(...), db=Depends(get_db))
             user_message=friendly_message,
             metadata={
                 "language": detected_language,
-                "row_count": len(results)
+                "row_count": len(results),
+                "sql_source": sql_source,
+                **message_metadata
             }
         )
         
+    except transcription.AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except transcription.TranscriptionQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except pool.PoolError as e:
+        logger.warning(f"Database pool exhausted: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
     except ImportError:
         raise HTTPException(status_code=400, detail="Whisper model not installed. Please install it with 'pip install whisper'.")
     except Exception as e:
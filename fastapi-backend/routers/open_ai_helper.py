@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from configs import config
 from typing import Dict, Any
@@ -7,18 +8,13 @@ import psycopg2
 import logging
 import json
 import re
-from openai import OpenAI
-from langchain_community.llms import OpenAI as LangchainOpenAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from db import get_db
+from db import get_db, connection
+from services import llm, schema_registry, sql_guard, sql_validator, transcription
 from datetime import datetime
 import sys
-import whisper
-import tempfile
 import os
 from dotenv import load_dotenv
-model = whisper.load_model("base")
 
 load_dotenv()
 
@@ -40,58 +36,38 @@ logger.addHandler(stream_handler)
 
 router = APIRouter()
 
-# Database connection details
-POSTGRES_HOST = "localhost"
-POSTGRES_DBNAME = "postgres"
-POSTGRES_USER = "postgres"
-POSTGRES_PASSWORD = "mocAi"
-POSTGRES_PORT = 5432
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 # Request body model
 class Request(BaseModel):
     action: str
     parameters: Dict[str, Any] = {}
 
-# Establish a connection to PostgreSQL database
-def connect_to_postgres():
-    try:
-        conn = psycopg2.connect(
-            host=POSTGRES_HOST,
-            dbname=POSTGRES_DBNAME,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            port=POSTGRES_PORT
-        )
-        return conn
-    except psycopg2.Error as e:
-        raise HTTPException(status_code=500, detail=f"Error while connecting to PostgreSQL: {e}")
-
-# Execute SQL query and fetch results
+# Execute LLM-generated SQL read-only, with a statement timeout, a plan-cost check and a default LIMIT
 def execute_sql_query(sql_query):
+    sql_query = sql_guard.with_limit(sql_query)
     try:
-        conn = connect_to_postgres()
-        cur = conn.cursor()
-        cur.execute(sql_query)
-        rows = cur.fetchall()
+        with sql_guard.statement_timeouts(), connection() as conn:
+            with conn.cursor() as cur:
+                sql_guard.guard(cur, sql_query)
+                cur.execute(sql_query)
+                rows = cur.fetchall()
         return rows
+    except sql_guard.QueryRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sql_guard.QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except psycopg2.Error as e:
         raise HTTPException(status_code=500, detail=f"Error executing SQL query: {e}")
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
             
 # need to check appointment for each employee and show me all appointments of artem from august from september so add llm here            
-def fetch_appointments(db: Session):
-    langchain_openai_client = LangchainOpenAI(openai_api_key=OPENAI_API_KEY)
-    cursor = db.cursor()
-    cursor.execute("SELECT title, description, start_time, end_time FROM appointments")
-    appointments = cursor.fetchall()
-    cursor.close()
+def load_appointments():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT title, description, start_time, end_time FROM appointments")
+            return cur.fetchall()
+
+async def fetch_appointments():
+    # Pool checkout and the query block, so they run in the threadpool
+    appointments = await run_in_threadpool(load_appointments)
     appointment_data = [
         {
             "title": app[0],
@@ -105,8 +81,7 @@ def fetch_appointments(db: Session):
         input_variables=["appointments"],
         template="Given the following list of appointment data: {appointments}, convert it into a structured JSON format suitable for a calendar application."
     )
-    llm_chain = LLMChain(llm=langchain_openai_client, prompt=prompt_template)
-    json_response = llm_chain.run({"appointments": json.dumps(appointment_data)})
+    json_response = await llm.complete(prompt_template.format(appointments=json.dumps(appointment_data)))
     processed_appointments = json.loads(json_response.strip())
     return processed_appointments
 
@@ -132,7 +107,12 @@ def create_appointment(appointment_data: Dict[str, Any], db: Session):
     finally:
         cursor.close()
 
-def determine_intent(action, langchain_client):
+async def determine_intent(action):
+    # Employee data keywords decide the intent on their own, so don't spend an LLM call on them
+    if "schedule" in action.lower() or "employee" in action.lower() or "work" in action.lower():
+        logger.debug("Action: '%s' was determined as Intent: 'querying employee data'", action)
+        return 'querying employee data'
+
     prompt_template = PromptTemplate(
         input_variables=["action"],
         template=(
@@ -144,49 +124,26 @@ def determine_intent(action, langchain_client):
 Respond with only the intent: 'Viewing', 'Booking', 'Querying Employee Data', or 'Unrelated'."""
         )
     )
-    chain = LLMChain(llm=langchain_client, prompt=prompt_template)
-    response = chain.run({"action": action})
+    response = await llm.complete(prompt_template.format(action=action))
     determined_intent = response.strip().lower()
 
-    # Add more specific checks for keywords related to employee data queries
-    if "schedule" in action.lower() or "employee" in action.lower() or "work" in action.lower():
-        determined_intent = 'querying employee data'
-
     logger.debug("Action: '%s' was determined as Intent: '%s'", action, determined_intent)
 
     return determined_intent
 
-def generate_sql_query(request: Request, db: Session):
+async def generate_sql_query(request: Request):
     try:
-        langchain_openai_client = LangchainOpenAI(openai_api_key=OPENAI_API_KEY)
-        
-        intent_template = PromptTemplate(
-            input_variables=["action"],
-            template="Determine the intent for this action: {action}. Is it related to viewing or setting appointments?"
-        )
-        intent_chain = LLMChain(llm=langchain_openai_client, prompt=intent_template)
-        intent_response = intent_chain.run({"action": request.action})
-        action_intent = intent_response.strip().lower()
-
-        
         # prompt template
         prompt_template = PromptTemplate(
             input_variables=["schemas", "action"],
             template=config.SQL_GENERATION_PROMPT
         )
         
-        chain = LLMChain(llm=langchain_openai_client, prompt=prompt_template)
-        
-        response = chain.run({"schemas": config.DATABASE_SCHEMAS, "action": request.action})
+        schema = await run_in_threadpool(schema_registry.get)
+        response = await llm.complete(prompt_template.format(schemas=schema.render(), action=request.action))
         
         response_text = response.strip()
 
-        # Validate SQL query
-        forbidden_commands = ["delete", "remove", "drop", "alter"]
-        for command in forbidden_commands:
-            if command in response_text.lower():
-                raise HTTPException(status_code=400, detail="Generated query contains forbidden operations.")
-        
         # Extract SQL query from the response
         sql_query_match = re.search(r"```sql\n(.*?)```", response_text, re.DOTALL)
         if sql_query_match:
@@ -199,6 +156,11 @@ def generate_sql_query(request: Request, db: Session):
             else:
                 sql_query = response_text
         
+        # Validate SQL query: read-only and limited to the allowed tables
+        analysis = sql_validator.analyze(sql_query.strip())
+        if not analysis.ok:
+            raise HTTPException(status_code=400, detail=f"Generated query rejected: {analysis.error}")
+        
         return sql_query.strip()
     except HTTPException:
         raise  
@@ -206,38 +168,34 @@ def generate_sql_query(request: Request, db: Session):
         raise HTTPException(status_code=500, detail=f"Error generating SQL query: {e}")
 
 # Generate user-friendly message using OpenAI
-def generate_user_friendly_message(action: str, result: any):
+async def generate_user_friendly_message(action: str, result: any):
     try:
-        langchain_openai_client = LangchainOpenAI(openai_api_key=OPENAI_API_KEY)
-        
         prompt_template = PromptTemplate(
             input_variables=["result", "action"],
             template=config.USER_FRIENDLY_MESSAGE_PROMPT
         )
         
-        chain = LLMChain(llm=langchain_openai_client, prompt=prompt_template)
-        
-        response = chain.run({"result": result, "action": action})
+        response = await llm.complete(prompt_template.format(result=result, action=action))
         
         response_text = response.strip()
         return response_text
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating user-friendly message: {e}")
     
-def improve_prompt_quality(prompt_template: PromptTemplate, input_data: dict, llm_chain: LLMChain, iterations: int = 3):
+async def improve_prompt_quality(prompt_template: PromptTemplate, input_data: dict, iterations: int = 3):
     best_prompt = prompt_template.template
     best_response = ""
     best_score = -float('inf')
 
     for i in range(iterations):
-        print(f"Iteration {i+1}: Current best prompt -> {best_prompt}")
+        logger.debug("Iteration %d: Current best prompt -> %s", i + 1, best_prompt)
         
         # Generate response using the current best prompt
-        response = llm_chain.run({"input_data": json.dumps(input_data)})
-        print(f"Generated Response: {response}")
+        response = await llm.complete(prompt_template.format(input_data=json.dumps(input_data)))
+        logger.debug("Generated Response: %s", response)
 
         score = evaluate_response_quality(response)
-        print(f"Response Quality Score: {score}")
+        logger.debug("Response Quality Score: %s", score)
 
         # If the new score is better, update the best prompt and best score
         if score > best_score:
@@ -247,9 +205,8 @@ def improve_prompt_quality(prompt_template: PromptTemplate, input_data: dict, ll
             # Modify the prompt to improve quality (customize this logic)
             best_prompt = refine_prompt(best_prompt, response)
             prompt_template = PromptTemplate(input_variables=["input_data"], template=best_prompt)
-            llm_chain = LLMChain(llm=llm_chain.llm, prompt=prompt_template)
 
-    print(f"Final Best Prompt: {best_prompt}")
+    logger.debug("Final Best Prompt: %s", best_prompt)
     return best_response
 
 def evaluate_response_quality(response: str) -> float:
@@ -280,35 +237,30 @@ def refine_prompt(current_prompt: str, last_response: str) -> str:
 @router.post("/transcribe/")
 async def transcribe_audio(file: UploadFile = File(...)):
     try:
-        # Create a temporary file to store the uploaded audio data
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            temp_file.write(await file.read())
-            temp_file_path = temp_file.name
-
-        audio = whisper.load_audio(temp_file_path)
-        audio = whisper.pad_or_trim(audio)
-        mel = whisper.log_mel_spectrogram(audio).to(model.device)
-
-        # Detect the language
-        _, probs = model.detect_language(mel)
-        detected_language = max(probs, key=probs.get)
-        print(f"Detected language: {detected_language}")
-
-        options = whisper.DecodingOptions()
-        result = whisper.decode(model, mel, options)
-        
-        # Clean up the temporary file
-        os.remove(temp_file_path)
+        # Read the upload in memory (size-capped) and transcribe on the worker pool
+        audio_bytes = await transcription.read_upload(file)
+        text, detected_language = await transcription.transcribe(audio_bytes)
+        logger.info("Detected language: %s", detected_language)
         
         return {
-            "text": result.text,
+            "text": text,
             "language": detected_language
         }
 
+    except transcription.AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except transcription.TranscriptionQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing the audio: {e}")
 
 
+@router.get("/transcribe/status")
+async def transcription_status():
+    """Which Whisper model is configured, whether it is loaded and how long loading took"""
+    return transcription.stats()
+
+
 @router.post("/create-appointment/")
 async def new_appointment(appointment_data: AppointmentSchema, db: Session = Depends(get_db)):
     try:
@@ -320,21 +272,20 @@ async def new_appointment(appointment_data: AppointmentSchema, db: Session = Dep
 
 
 @router.post("/generate-message/")
-async def generate_message(request: Request, db: Session = Depends(get_db)):
+async def generate_message(request: Request):
     try:
         action_type = request.action.lower()
-        langchain_openai_client = LangchainOpenAI(api_key=OPENAI_API_KEY)
 
-        # Determine the user intent using LangChain
-        user_intent = determine_intent(request.action, langchain_openai_client)
+        # Determine the user intent using the LLM
+        user_intent = await determine_intent(request.action)
         if user_intent == "viewing":
-            appointments = fetch_appointments(db)
+            appointments = await fetch_appointments()
             return {"appointments": appointments}
         elif user_intent == "booking":
             return {"intent": "booking"}
         else:
             # Handle non-appointment related actions using SQL queries
-            response_query = generate_sql_query(request, db)
+            response_query = await generate_sql_query(request)
             pattern = r"```sql\n(.*?)```"
             matches = re.search(pattern, response_query, re.DOTALL)
             if not matches:
@@ -343,13 +294,10 @@ async def generate_message(request: Request, db: Session = Depends(get_db)):
                 sql_query = matches.group(1).strip() if matches else response_query.strip()
 
             # Execute the SQL query
-            result = execute_sql_query(sql_query)
+            result = await run_in_threadpool(execute_sql_query, sql_query)
 
             # Generate the user-friendly message using another LangChain prompt
-            user_friendly_message = generate_user_friendly_message(request.action, result)
-        
-            # Improve the prompt quality before generating the final message
-            improved_response = improve_prompt_quality(prompt_template, {"result": result, "action": request.action}, llm_chain)
+            user_friendly_message = await generate_user_friendly_message(request.action, result)
             return {"user_friendly_message": user_friendly_message}
     except HTTPException as e:
         raise e
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from datetime import date
 from db import get_db
+from services import pagination
 from models.reservation import Reservation
 
 router = APIRouter()
@@ -21,12 +24,23 @@ async def create_reservation(employee_id: int, start_date: str, end_date: str, r
         return {"error": str(e)}
 
 @router.get("/reservations/")
-async def read_reservations(db=Depends(get_db)):
+async def read_reservations(limit: int = Query(pagination.PAGE_DEFAULT_LIMIT, ge=1, le=pagination.PAGE_MAX_LIMIT),
+                            after: Optional[int] = None, employee_id: Optional[int] = None,
+                            date_from: Optional[date] = None, date_to: Optional[date] = None,
+                            db=Depends(get_db)):
     try:
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM reservations")
-        reservations = cursor.fetchall()
-        return {"reservations": reservations}
+        conditions = []
+        if employee_id is not None:
+            conditions.append(("employee_id = %s", employee_id))
+        # Date range keeps reservations that overlap [date_from, date_to]. Work reservations have no
+        # start/end date and carry their day in work_date. Pages stay in id order, so unlike the
+        # employee_id filter this is not a single index range scan per page
+        if date_from is not None:
+            conditions.append(("COALESCE(end_date, work_date) >= %s", date_from))
+        if date_to is not None:
+            conditions.append(("COALESCE(start_date, work_date) <= %s", date_to))
+        reservations, next_cursor = pagination.fetch_page(db, "reservations", conditions, after, limit)
+        return {"reservations": reservations, "next_cursor": next_cursor}
     except Exception as e:
         return {"error": str(e)}
 
@@ -1,24 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Dict, Iterable, List, Any, Optional, AsyncIterator, Tuple
+import asyncio
 import logging
-import requests
+import httpx
 import json
 import sys
 import os
 from dotenv import load_dotenv
 import re
 from datetime import datetime
-from openai import OpenAI
-from langchain_community.llms import OpenAI as LangchainOpenAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
 
 load_dotenv()
 
 # Import the actual model classes, not the module
 from models.weather_assistant import WeatherDressRequest, WeatherDressResponse
-from db import get_db
+from db import connection
 from configs import config
+from services import http_client, forecast_cache, recommendation_cache, outfit_engine, llm
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -27,18 +28,17 @@ stream_handler = logging.StreamHandler(sys.stdout)
 log_formatter = logging.Formatter("%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s")
 stream_handler.setFormatter(log_formatter)
 logger.addHandler(stream_handler)
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # API configurations
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", OPENAI_API_KEY)
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "3a2fe0c82a733d1276bd991c1ba2cb76")  # Replace with your actual key
 WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/forecast"
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Total time the recommendation LLM call may take before falling back to the rule-based engine
+RECOMMENDATION_LLM_DEADLINE_SECONDS = float(os.getenv("RECOMMENDATION_LLM_DEADLINE_SECONDS", "15"))
 
-# Initialize LangChain OpenAI client
-langchain_openai = LangchainOpenAI(openai_api_key=OPENAI_API_KEY)
+# Batch endpoint limits
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "5000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
 
 router = APIRouter(
     prefix="/api/weather-assistant",
@@ -46,10 +46,7 @@ router = APIRouter(
 )
 
 @router.post("/dress-recommendation", response_model=WeatherDressResponse)
-async def get_dress_recommendation(
-    request: WeatherDressRequest, 
-    db=Depends(get_db)
-):
+async def get_dress_recommendation(request: WeatherDressRequest):
     """
     Get clothing recommendations based on weather forecast for a specific date
     """
@@ -58,15 +55,18 @@ async def get_dress_recommendation(
         weather_data = await get_weather_forecast(request.location, request.date)
         
         # 2. Get user's clothing inventory from database or mock data
-        user_clothes = get_user_clothes(db, request.user_id)
+        user_clothes = (await run_in_threadpool(load_users_clothes, [request.user_id]))[request.user_id]
         
-        # 3. Use OpenAI to generate clothing recommendations
-        recommendations = get_clothing_recommendations(
-            weather_data, 
-            user_clothes,
-            request.occasion,
-            request.preferences
-        )
+        # 3. Use the rule-based engine (fast mode) or OpenAI to generate clothing recommendations
+        if request.mode == "fast":
+            recommendations = outfit_engine.recommend_outfit(weather_data, user_clothes, request.occasion)
+        else:
+            recommendations = await get_clothing_recommendations(
+                weather_data, 
+                user_clothes,
+                request.occasion,
+                request.preferences
+            )
         
         return WeatherDressResponse(
             date=request.date,
@@ -81,6 +81,164 @@ async def get_dress_recommendation(
         logger.error(f"Error generating dress recommendations: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/dress-recommendation/stream")
+async def stream_dress_recommendation(request: WeatherDressRequest):
+    """
+    Server-sent events variant of /dress-recommendation: emits a "weather" event
+    as soon as the forecast is known, "token" events while the LLM writes, and
+    a final "result" event with the same payload as the non-streaming endpoint
+    """
+    # Load the inventory off the event loop; the pooled connection is back before the stream starts
+    user_clothes = (await run_in_threadpool(load_users_clothes, [request.user_id]))[request.user_id]
+    
+    return StreamingResponse(
+        dress_recommendation_events(request, user_clothes),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def dress_recommendation_events(request: WeatherDressRequest, user_clothes: Dict[str, Any]) -> AsyncIterator[str]:
+    # Failures end the stream with an "error" event where the non-streaming endpoint would return an error status
+    try:
+        async for event in recommendation_events(request, user_clothes):
+            yield event
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        logger.error(f"Error streaming dress recommendations: {str(e)}", exc_info=True)
+        yield sse_event("error", {"status_code": 500, "detail": str(e)})
+
+async def recommendation_events(request: WeatherDressRequest, user_clothes: Dict[str, Any]) -> AsyncIterator[str]:
+    weather_data = await get_weather_forecast(request.location, request.date)
+    
+    yield sse_event("weather", {
+        "date": request.date,
+        "location": request.location,
+        "weather_summary": weather_data["summary"],
+        "temperature": weather_data["temperature"],
+        "conditions": weather_data["conditions"]
+    })
+    
+    cache_key = recommendation_cache.recommendation_key(weather_data, user_clothes, request.occasion, request.preferences)
+    if request.mode == "fast":
+        recommendations = outfit_engine.recommend_outfit(weather_data, user_clothes, request.occasion)
+    else:
+        recommendations = recommendation_cache.get(cache_key)
+    
+    if recommendations is None:
+        try:
+            prompt = build_recommendation_prompt(weather_data, user_clothes, request.occasion, request.preferences)
+            chunks = []
+            async for token in llm.chat_stream(recommendation_messages(prompt), model="gpt-4", temperature=0.7, max_tokens=800, max_retries=0):
+                chunks.append(token)
+                yield sse_event("token", {"text": token})
+            
+            recommendations = parse_recommendations("".join(chunks), weather_data, user_clothes, request.occasion, cache_key)
+        except Exception as e:
+            logger.error(f"Error streaming clothing recommendations, falling back to rules: {str(e)}", exc_info=True)
+            recommendations = outfit_engine.recommend_outfit(weather_data, user_clothes, request.occasion)
+    
+    yield sse_event("result", WeatherDressResponse(
+        date=request.date,
+        location=request.location,
+        weather_summary=weather_data["summary"],
+        temperature=weather_data["temperature"],
+        conditions=weather_data["conditions"],
+        recommendations=recommendations
+    ))
+
+@router.post("/dress-recommendation/batch")
+async def batch_dress_recommendations(requests: List[WeatherDressRequest]):
+    """
+    Recommendations for many users/locations in one call, streamed back as
+    NDJSON lines of {"index": ..., "response": ...} or {"index": ..., "error": ...}
+    in completion order. Each location's forecast is fetched once and identical
+    recommendation inputs share one LLM call.
+    """
+    if len(requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large: at most {BATCH_MAX_SIZE} requests are allowed.")
+    
+    # Load every distinct user's inventory up front in one query, off the event loop; the pooled connection is back before the stream starts
+    inventories = await run_in_threadpool(load_users_clothes, {request.user_id for request in requests})
+    
+    return StreamingResponse(batch_recommendation_lines(requests, inventories), media_type="application/x-ndjson")
+
+def ndjson_line(data: Any) -> str:
+    return json.dumps(jsonable_encoder(data)) + "\n"
+
+async def batch_recommendation_lines(requests: List[WeatherDressRequest], inventories: Dict[int, Dict[str, Any]]) -> AsyncIterator[str]:
+    # 1. One forecast lookup per distinct (location, date)
+    weather_keys = list({(forecast_cache.normalize_location(request.location), request.date) for request in requests})
+    weather_results = await asyncio.gather(
+        *(get_weather_forecast(location, date) for location, date in weather_keys),
+        return_exceptions=True
+    )
+    weather_by_key = dict(zip(weather_keys, weather_results))
+    
+    # 2. Group requests whose recommendation inputs are identical
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for index, request in enumerate(requests):
+        weather_data = weather_by_key[(forecast_cache.normalize_location(request.location), request.date)]
+        if isinstance(weather_data, Exception):
+            detail = weather_data.detail if isinstance(weather_data, HTTPException) else str(weather_data)
+            yield ndjson_line({"index": index, "error": detail})
+            continue
+        
+        key = recommendation_cache.recommendation_key(weather_data, inventories[request.user_id], request.occasion, request.preferences)
+        groups.setdefault((request.mode, key), []).append(index)
+    
+    # 3. Run the remaining recommendation calls concurrently under a limit
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def recommend(group_key: Tuple[str, str], index: int):
+        request = requests[index]
+        weather_data = weather_by_key[(forecast_cache.normalize_location(request.location), request.date)]
+        async with semaphore:
+            try:
+                if request.mode == "fast":
+                    return group_key, outfit_engine.recommend_outfit(weather_data, inventories[request.user_id], request.occasion)
+                return group_key, await get_clothing_recommendations(weather_data, inventories[request.user_id], request.occasion, request.preferences)
+            except Exception as e:
+                logger.error(f"Error generating batch dress recommendations: {str(e)}", exc_info=True)
+                return group_key, e
+    
+    tasks = [asyncio.ensure_future(recommend(group_key, indexes[0])) for group_key, indexes in groups.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            group_key, recommendations = await next_done
+            for index in groups[group_key]:
+                if isinstance(recommendations, Exception):
+                    yield ndjson_line({"index": index, "error": str(recommendations)})
+                    continue
+                
+                request = requests[index]
+                weather_data = weather_by_key[(forecast_cache.normalize_location(request.location), request.date)]
+                yield ndjson_line({"index": index, "response": WeatherDressResponse(
+                    date=request.date,
+                    location=request.location,
+                    weather_summary=weather_data["summary"],
+                    temperature=weather_data["temperature"],
+                    conditions=weather_data["conditions"],
+                    recommendations=recommendations
+                )})
+    finally:
+        # Stop outstanding LLM calls if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss metrics for the forecast and recommendation caches
+    """
+    return {
+        "forecast": forecast_cache.stats(),
+        "recommendations": recommendation_cache.stats()
+    }
+
 async def get_weather_forecast(location: str, date: str) -> Dict[str, Any]:
     """
     Get weather forecast for a specific location and date from OpenWeatherMap API
@@ -89,115 +247,124 @@ async def get_weather_forecast(location: str, date: str) -> Dict[str, Any]:
         # Convert date string to datetime
         target_date = datetime.strptime(date, "%Y-%m-%d")
         
-        # Make API request to OpenWeatherMap
-        params = {
-            "q": location,
-            "appid": WEATHER_API_KEY,
-            "units": "metric"  # Use metric units (Celsius)
-        }
-        
-        response = requests.get(WEATHER_API_URL, params=params)
-        response.raise_for_status()
-        
-        forecast_data = response.json()
-        
-        # Find forecast for the target date (closest match to noon)
-        target_forecast = None
-        min_diff = float('inf')
-        
-        for forecast in forecast_data["list"]:
-            forecast_datetime = datetime.fromtimestamp(forecast["dt"])
-            
-            # Check if this is the correct date
-            if forecast_datetime.date() == target_date.date():
-                # Find the forecast closest to noon
-                hours_from_noon = abs(forecast_datetime.hour - 12)
-                if hours_from_noon < min_diff:
-                    min_diff = hours_from_noon
-                    target_forecast = forecast
+        # Served from the forecast cache unless this location's 3-hour slot is not cached yet
+        forecast = await forecast_cache.get_or_fetch(location, fetch_forecast_data)
         
-        if not target_forecast:
-            # If no exact match, take the closest available forecast
-            # (This would happen if the target date is beyond the 5-day forecast range)
+        day_forecast = forecast.day(target_date.date())
+        if not day_forecast:
+            # This would happen if the target date is beyond the 5-day forecast range
             raise HTTPException(
                 status_code=400, 
                 detail=f"Weather forecast not available for {date}. Please choose a date within the next 5 days."
             )
         
+        # Use the forecast closest to noon as representative for the day
+        target_forecast = day_forecast.closest_to(12)
+        
         # Extract relevant weather information
         weather_data = {
-            "temperature": target_forecast["main"]["temp"],
-            "feels_like": target_forecast["main"]["feels_like"],
-            "humidity": target_forecast["main"]["humidity"],
-            "conditions": target_forecast["weather"][0]["main"],
-            "description": target_forecast["weather"][0]["description"],
-            "wind_speed": target_forecast["wind"]["speed"],
-            "summary": f"{target_forecast['weather'][0]['main']} with temperature of {target_forecast['main']['temp']}°C"
+            "temperature": target_forecast.temperature,
+            "feels_like": target_forecast.feels_like,
+            "humidity": target_forecast.humidity,
+            "conditions": target_forecast.conditions,
+            "description": target_forecast.description,
+            "wind_speed": target_forecast.wind_speed,
+            "temp_min": day_forecast.temp_min,
+            "temp_max": day_forecast.temp_max,
+            "precipitation": day_forecast.precipitation_total,
+            "summary": f"{target_forecast.conditions} with temperature of {target_forecast.temperature}°C"
         }
         
         return weather_data
     
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving weather data: {str(e)}")
 
+async def fetch_forecast_data(location: str) -> Dict[str, Any]:
+    """
+    Download the raw 5-day / 3-hour forecast for a location from OpenWeatherMap
+    """
+    params = {
+        "q": location,
+        "appid": WEATHER_API_KEY,
+        "units": "metric"  # Use metric units (Celsius)
+    }
+    
+    return await http_client.get_json(WEATHER_API_URL, params=params)
+
 def get_user_clothes(db, user_id: int) -> Dict[str, Any]:
     """
     For the demo, we're using mock clothing inventory since your database schema 
     doesn't include a clothing table. In a production app, you'd create this table.
     """
+    return get_users_clothes(db, [user_id])[user_id]
+
+def get_users_clothes(db, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Clothing inventories for many users, checked against the employees table
+    in a single query
+    """
+    user_ids = list(user_ids)
     try:
-        # Check if the user exists in the employees table
         cur = db.cursor()
-        cur.execute('SELECT id, name FROM "employees" WHERE id = %s', (user_id,))
-        user = cur.fetchone()
+        cur.execute('SELECT id, name FROM "employees" WHERE id = ANY(%s)', (user_ids,))
+        found = {row[0] for row in cur.fetchall()}
         cur.close()
         
-        if not user:
-            logger.warning(f"User ID {user_id} not found in employees table")
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            logger.warning(f"User IDs {missing[:20]}{'...' if len(missing) > 20 else ''} not found in employees table")
             # Continue with mock data anyway for demo purposes
-        else:
-            logger.info(f"Found user: {user[1]} (ID: {user[0]})")
+        logger.info(f"Found {len(found)} of {len(user_ids)} users")
         
-        # Mock clothing inventory - in production, this would come from a user_clothes table
-        mock_inventory = {
-            "tops": [
-                {"id": 1, "type": "t-shirt", "color": "white", "material": "cotton", "warmth": "light"},
-                {"id": 2, "type": "sweater", "color": "gray", "material": "wool", "warmth": "warm"},
-                {"id": 3, "type": "hoodie", "color": "black", "material": "cotton", "warmth": "medium"},
-                {"id": 4, "type": "jacket", "color": "blue", "material": "denim", "warmth": "medium"},
-                {"id": 5, "type": "coat", "color": "brown", "material": "wool", "warmth": "heavy"},
-            ],
-            "bottoms": [
-                {"id": 1, "type": "jeans", "color": "blue", "material": "denim", "warmth": "medium"},
-                {"id": 2, "type": "shorts", "color": "khaki", "material": "cotton", "warmth": "light"},
-                {"id": 3, "type": "sweatpants", "color": "gray", "material": "cotton", "warmth": "medium"},
-                {"id": 4, "type": "slacks", "color": "black", "material": "polyester", "warmth": "medium"},
-            ],
-            "footwear": [
-                {"id": 1, "type": "sneakers", "color": "white", "material": "canvas", "warmth": "medium"},
-                {"id": 2, "type": "boots", "color": "brown", "material": "leather", "warmth": "warm"},
-                {"id": 3, "type": "sandals", "color": "brown", "material": "leather", "warmth": "light"},
-            ],
-            "accessories": [
-                {"id": 1, "type": "hat", "color": "black", "material": "wool", "warmth": "warm"},
-                {"id": 2, "type": "scarf", "color": "red", "material": "wool", "warmth": "warm"},
-                {"id": 3, "type": "gloves", "color": "black", "material": "leather", "warmth": "warm"},
-                {"id": 4, "type": "sunglasses", "color": "black", "material": "plastic", "warmth": "light"},
-                {"id": 5, "type": "umbrella", "color": "blue", "material": "nylon", "warmth": "light"},
-            ]
-        }
-        
-        return mock_inventory
+        return {user_id: mock_inventory() for user_id in user_ids}
         
     except Exception as e:
         logger.error(f"Error fetching user clothes: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching user clothes: {str(e)}")
 
-def get_clothing_recommendations(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str] = None, preferences: Optional[str] = None) -> Dict[str, Any]:
+def load_users_clothes(user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
     """
-    Generate clothing recommendations using OpenAI
+    get_users_clothes on a connection borrowed only for the query. Blocking,
+    so the endpoints call it through run_in_threadpool
+    """
+    with connection() as db:
+        return get_users_clothes(db, user_ids)
+
+def mock_inventory() -> Dict[str, Any]:
+    # Mock clothing inventory - in production, this would come from a user_clothes table
+    return {
+        "tops": [
+            {"id": 1, "type": "t-shirt", "color": "white", "material": "cotton", "warmth": "light"},
+            {"id": 2, "type": "sweater", "color": "gray", "material": "wool", "warmth": "warm"},
+            {"id": 3, "type": "hoodie", "color": "black", "material": "cotton", "warmth": "medium"},
+            {"id": 4, "type": "jacket", "color": "blue", "material": "denim", "warmth": "medium"},
+            {"id": 5, "type": "coat", "color": "brown", "material": "wool", "warmth": "heavy"},
+        ],
+        "bottoms": [
+            {"id": 1, "type": "jeans", "color": "blue", "material": "denim", "warmth": "medium"},
+            {"id": 2, "type": "shorts", "color": "khaki", "material": "cotton", "warmth": "light"},
+            {"id": 3, "type": "sweatpants", "color": "gray", "material": "cotton", "warmth": "medium"},
+            {"id": 4, "type": "slacks", "color": "black", "material": "polyester", "warmth": "medium"},
+        ],
+        "footwear": [
+            {"id": 1, "type": "sneakers", "color": "white", "material": "canvas", "warmth": "medium"},
+            {"id": 2, "type": "boots", "color": "brown", "material": "leather", "warmth": "warm"},
+            {"id": 3, "type": "sandals", "color": "brown", "material": "leather", "warmth": "light"},
+        ],
+        "accessories": [
+            {"id": 1, "type": "hat", "color": "black", "material": "wool", "warmth": "warm"},
+            {"id": 2, "type": "scarf", "color": "red", "material": "wool", "warmth": "warm"},
+            {"id": 3, "type": "gloves", "color": "black", "material": "leather", "warmth": "warm"},
+            {"id": 4, "type": "sunglasses", "color": "black", "material": "plastic", "warmth": "light"},
+            {"id": 5, "type": "umbrella", "color": "blue", "material": "nylon", "warmth": "light"},
+        ]
+    }
+
+def build_recommendation_prompt(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str] = None, preferences: Optional[str] = None) -> str:
+    """
+    Build the OpenAI prompt from the weather and the pre-selected inventory candidates
     """
-    # Construct the prompt for OpenAI
     prompt = f"""
     Generate clothing recommendations based on the following weather forecast and available clothing items.
     
@@ -207,7 +374,7 @@ def get_clothing_recommendations(weather_data: Dict[str, Any], user_clothes: Dic
     - Description: {weather_data['description']}
     
     Available clothing items:
-    {json.dumps(user_clothes, indent=2)}
+    {json.dumps(outfit_engine.candidate_items(weather_data, user_clothes), indent=2)}
     """
     
     # Add occasion if provided
@@ -237,43 +404,56 @@ def get_clothing_recommendations(weather_data: Dict[str, Any], user_clothes: Dic
         "tips": ["tip1", "tip2", ...]
     }
     """
+    return prompt
+
+def recommendation_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a helpful fashion and weather assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_recommendations(recommendations_text: str, weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str], cache_key: str) -> Dict[str, Any]:
+    """
+    Parse the LLM answer into the recommendations dict and cache it
+    """
+    recommendations_text = recommendations_text.strip()
+    
+    # Extract the JSON part if it's surrounded by markdown code blocks
+    if "```json" in recommendations_text:
+        recommendations_text = recommendations_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in recommendations_text:
+        recommendations_text = recommendations_text.split("```")[1].split("```")[0].strip()
     
     try:
-        # Call OpenAI Chat API
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful fashion and weather assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        # Extract the recommendations from the response
-        recommendations_text = response.choices[0].message.content.strip()
-        
-        # Extract the JSON part if it's surrounded by markdown code blocks
-        if "```json" in recommendations_text:
-            recommendations_text = recommendations_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in recommendations_text:
-            recommendations_text = recommendations_text.split("```")[1].split("```")[0].strip()
-        
-        # Parse the recommendations as JSON
         recommendations = json.loads(recommendations_text)
-        return recommendations
-    
     except json.JSONDecodeError:
-        # If parsing fails, return a basic structure with the raw text
-        return {
-            "summary": recommendations_text,
-            "outfit": {},
-            "tips": []
-        }
+        # If parsing fails, keep the raw text and let the rule-based engine pick the outfit
+        fallback = outfit_engine.recommend_outfit(weather_data, user_clothes, occasion)
+        return {**fallback, "summary": recommendations_text}
+    
+    recommendation_cache.put(cache_key, recommendations)
+    return recommendations
+
+async def get_clothing_recommendations(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str] = None, preferences: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate clothing recommendations using OpenAI
+    """
+    # Identical inputs (after quantizing the weather) reuse a previous answer
+    cache_key = recommendation_cache.recommendation_key(weather_data, user_clothes, occasion, preferences)
+    cached_recommendations = recommendation_cache.get(cache_key)
+    if cached_recommendations is not None:
+        return cached_recommendations
+    
+    prompt = build_recommendation_prompt(weather_data, user_clothes, occasion, preferences)
+    
+    try:
+        # Call OpenAI Chat API without retries, so a slow LLM falls back to rules within the deadline
+        recommendations_text = await llm.chat(recommendation_messages(prompt), model="gpt-4", temperature=0.7, max_tokens=800,
+                                              timeout=RECOMMENDATION_LLM_DEADLINE_SECONDS, max_retries=0,
+                                              deadline=RECOMMENDATION_LLM_DEADLINE_SECONDS)
+        
+        return parse_recommendations(recommendations_text, weather_data, user_clothes, occasion, cache_key)
+    
     except Exception as e:
-        logger.error(f"Error generating clothing recommendations: {str(e)}", exc_info=True)
-        return {
-            "summary": f"Error generating recommendations: {str(e)}",
-            "outfit": {},
-            "tips": []
-        }
\ No newline at end of file
+        logger.error(f"Error generating clothing recommendations, falling back to rules: {str(e)}", exc_info=True)
+        return outfit_engine.recommend_outfit(weather_data, user_clothes, occasion)
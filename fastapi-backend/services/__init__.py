@@ -0,0 +1,2 @@
+# services/__init__.py
+# Shared clients, caches and helpers used by the routers.
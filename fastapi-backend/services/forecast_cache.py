@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from models.forecast import ForecastIndex
+from services.cache import SingleFlight, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# OpenWeatherMap refreshes the 5-day forecast in 3-hour steps
+FORECAST_SLOT_SECONDS = 3 * 60 * 60
+FORECAST_CACHE_MAXSIZE = int(os.getenv("FORECAST_CACHE_MAXSIZE", "1024"))
+# Optional shared backend so every worker reuses the same forecast, e.g. redis://localhost:6379/0
+FORECAST_CACHE_REDIS_URL = os.getenv("FORECAST_CACHE_REDIS_URL")
+
+_local_cache = TTLCache(maxsize=FORECAST_CACHE_MAXSIZE)
+_inflight = SingleFlight()
+_redis = None
+_redis_disabled = False
+
+def normalize_location(location: str) -> str:
+    """Normalize a location so 'London, UK' and ' london,uk' share one entry"""
+    location = re.sub(r"\s+", " ", location.strip().casefold())
+    return re.sub(r"\s*,\s*", ",", location)
+
+def current_slot(now: Optional[float] = None) -> int:
+    now = time.time() if now is None else now
+    return int(now // FORECAST_SLOT_SECONDS)
+
+def seconds_until_next_slot(now: Optional[float] = None) -> float:
+    now = time.time() if now is None else now
+    return (current_slot(now) + 1) * FORECAST_SLOT_SECONDS - now
+
+def cache_key(location: str, now: Optional[float] = None) -> str:
+    return f"forecast:{normalize_location(location)}:{current_slot(now)}"
+
+async def get_or_fetch(location: str, fetch: Callable[[str], Awaitable[Dict[str, Any]]]) -> ForecastIndex:
+    """
+    Return the parsed forecast for a location, calling fetch(normalized_location)
+    only on a miss. Entries live until the end of the current 3-hour slot and
+    concurrent misses for the same key share a single upstream call.
+    """
+    key = cache_key(location)
+    forecast = _local_cache.get(key)
+    if forecast is not None:
+        return forecast
+
+    return await _inflight.do(key, lambda: _load(key, normalize_location(location), fetch))
+
+async def _load(key: str, location: str, fetch: Callable[[str], Awaitable[Dict[str, Any]]]) -> ForecastIndex:
+    # The shared backend holds the raw JSON; the local cache keeps the parsed index
+    forecast_data = await _shared_get(key)
+    if forecast_data is None:
+        forecast_data = await fetch(location)
+        await _shared_set(key, forecast_data, seconds_until_next_slot())
+
+    forecast = ForecastIndex.from_openweathermap(forecast_data)
+    _local_cache.set(key, forecast, ttl=seconds_until_next_slot())
+    return forecast
+
+def stats() -> Dict[str, Any]:
+    return _local_cache.stats()
+
+def clear():
+    _local_cache.clear()
+
+def _get_redis():
+    global _redis, _redis_disabled
+    if _redis is None and FORECAST_CACHE_REDIS_URL and not _redis_disabled:
+        try:
+            import redis.asyncio as redis
+            _redis = redis.from_url(FORECAST_CACHE_REDIS_URL)
+        except ImportError:
+            logger.warning("FORECAST_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only")
+            _redis_disabled = True
+    return _redis
+
+async def _shared_get(key: str) -> Optional[Dict[str, Any]]:
+    client = _get_redis()
+    if client is None:
+        return None
+    try:
+        payload = await client.get(key)
+        return json.loads(payload) if payload else None
+    except Exception as e:
+        logger.warning(f"Shared forecast cache read failed: {str(e)}")
+        return None
+
+async def _shared_set(key: str, forecast_data: Dict[str, Any], ttl: float):
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        await client.set(key, json.dumps(forecast_data), ex=max(int(ttl), 1))
+    except Exception as e:
+        logger.warning(f"Shared forecast cache write failed: {str(e)}")
@@ -0,0 +1,55 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Outbound HTTP settings (per worker process)
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_MAX_CONCURRENT_REQUESTS = int(os.getenv("HTTP_MAX_CONCURRENT_REQUESTS", "20"))
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared AsyncClient, creating it on first use so keep-alive
+    connections are reused across requests
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+    return _client
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENT_REQUESTS)
+    return _semaphore
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    GET a URL with the shared client and return the decoded JSON body.
+    Raises httpx.HTTPError on transport errors, timeouts and non-2xx responses.
+    """
+    async with _get_semaphore():
+        response = await get_http_client().get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
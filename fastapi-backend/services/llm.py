@@ -0,0 +1,105 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# LLM call settings (per worker process)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Same defaults as LangChain's OpenAI LLM, which the text-completion prompts were written against
+LLM_COMPLETION_MODEL = os.getenv("LLM_COMPLETION_MODEL", "gpt-3.5-turbo-instruct")
+LLM_COMPLETION_MAX_TOKENS = int(os.getenv("LLM_COMPLETION_MAX_TOKENS", "256"))
+LLM_EMBEDDING_MODEL = os.getenv("LLM_EMBEDDING_MODEL", "text-embedding-3-small")
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_client() -> AsyncOpenAI:
+    """Return the shared async OpenAI client so HTTP connections are reused"""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES)
+    return _client
+
+def _client_for(max_retries: Optional[int]) -> AsyncOpenAI:
+    client = get_client()
+    return client if max_retries is None else client.with_options(max_retries=max_retries)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def chat(messages: List[Dict[str, str]], model: str = "gpt-4", temperature: float = 0.7,
+               max_tokens: Optional[int] = None, timeout: float = LLM_TIMEOUT_SECONDS,
+               max_retries: Optional[int] = None, deadline: Optional[float] = None) -> str:
+    """
+    Run a chat completion and return the message text. max_retries overrides
+    the client's retry count; deadline bounds the whole call, including the
+    concurrency queue and any retries, and raises asyncio.TimeoutError.
+    """
+    async def run() -> str:
+        async with _get_semaphore():
+            response = await _client_for(max_retries).chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout
+            )
+        return response.choices[0].message.content or ""
+
+    if deadline is None:
+        return await run()
+    return await asyncio.wait_for(run(), deadline)
+
+async def chat_stream(messages: List[Dict[str, str]], model: str = "gpt-4", temperature: float = 0.7,
+                      max_tokens: Optional[int] = None, timeout: float = LLM_TIMEOUT_SECONDS,
+                      max_retries: Optional[int] = None) -> AsyncIterator[str]:
+    """Run a streaming chat completion and yield text tokens as they arrive"""
+    async with _get_semaphore():
+        stream = await _client_for(max_retries).chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            stream=True
+        )
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yield token
+
+async def complete(prompt: str, model: str = LLM_COMPLETION_MODEL, temperature: float = 0.7,
+                   max_tokens: int = LLM_COMPLETION_MAX_TOKENS, timeout: float = LLM_TIMEOUT_SECONDS) -> str:
+    """Run a text completion, the async replacement for LLMChain.run"""
+    async with _get_semaphore():
+        response = await get_client().completions.create(
+            model=model,
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    return response.choices[0].text
+
+async def embed(text: str, model: str = LLM_EMBEDDING_MODEL, timeout: float = LLM_TIMEOUT_SECONDS) -> List[float]:
+    """Return the embedding vector for a piece of text"""
+    async with _get_semaphore():
+        response = await get_client().embeddings.create(model=model, input=text, timeout=timeout)
+    return response.data[0].embedding
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,122 @@
+from typing import Any, Dict, List, Optional
+
+# Ordinal scale for the "warmth" attribute of inventory items
+WARMTH_LEVELS = {"light": 1, "medium": 2, "warm": 3, "heavy": 4}
+
+# Strong wind makes it feel this many °C colder
+WIND_CHILL_THRESHOLD = 8.0  # m/s
+WIND_CHILL_PENALTY = 3.0
+
+WET_CONDITIONS = {"rain", "drizzle", "thunderstorm", "snow"}
+SUNNY_CONDITIONS = {"clear"}
+
+# Items that are a poor match for wet weather regardless of warmth
+WET_WEATHER_PENALTIES = {"sandals": 3, "canvas": 1, "shorts": 1}
+
+CATEGORY_SLOTS = {"tops": "top", "bottoms": "bottom", "footwear": "footwear"}
+
+def effective_temperature(weather_data: Dict[str, Any]) -> float:
+    temperature = weather_data.get("feels_like", weather_data["temperature"])
+    if weather_data.get("wind_speed", 0) >= WIND_CHILL_THRESHOLD:
+        temperature -= WIND_CHILL_PENALTY
+    return temperature
+
+def target_warmth(temperature: float) -> int:
+    """Map a feels-like temperature (°C) to the warmth level to aim for"""
+    if temperature >= 22:
+        return WARMTH_LEVELS["light"]
+    if temperature >= 15:
+        return WARMTH_LEVELS["medium"]
+    if temperature >= 8:
+        return WARMTH_LEVELS["warm"]
+    return WARMTH_LEVELS["heavy"]
+
+def _is_wet(weather_data: Dict[str, Any]) -> bool:
+    return weather_data["conditions"].lower() in WET_CONDITIONS or weather_data.get("precipitation", 0) > 0
+
+def score_item(item: Dict[str, Any], target: int, wet: bool) -> float:
+    score = -abs(WARMTH_LEVELS.get(item.get("warmth"), WARMTH_LEVELS["medium"]) - target)
+    if wet:
+        score -= WET_WEATHER_PENALTIES.get(item.get("type"), 0)
+        score -= WET_WEATHER_PENALTIES.get(item.get("material"), 0)
+    return score
+
+def describe(item: Dict[str, Any]) -> str:
+    return f"{item.get('color', '')} {item.get('type', '')}".strip().capitalize()
+
+def rank_items(items: List[Dict[str, Any]], weather_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Sort items best match first; ties keep inventory order"""
+    target = target_warmth(effective_temperature(weather_data))
+    wet = _is_wet(weather_data)
+    return sorted(items, key=lambda item: -score_item(item, target, wet))
+
+def select_accessories(accessories: List[Dict[str, Any]], weather_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    temperature = effective_temperature(weather_data)
+    conditions = weather_data["conditions"].lower()
+
+    wanted = set()
+    if _is_wet(weather_data):
+        wanted.add("umbrella")
+    if conditions in SUNNY_CONDITIONS and temperature >= 15:
+        wanted.add("sunglasses")
+    if temperature < 5:
+        wanted.update({"hat", "scarf", "gloves"})
+    elif temperature < 10:
+        wanted.add("scarf")
+
+    return [item for item in accessories if item.get("type") in wanted]
+
+def candidate_items(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], per_category: int = 3) -> Dict[str, Any]:
+    """
+    Shrink the inventory to the best few items per category, used to keep
+    the LLM prompt small
+    """
+    candidates = {}
+    for category, items in user_clothes.items():
+        if category == "accessories":
+            candidates[category] = select_accessories(items, weather_data) or items[:per_category]
+        else:
+            candidates[category] = rank_items(items, weather_data)[:per_category]
+    return candidates
+
+def build_tips(weather_data: Dict[str, Any], temperature: float) -> List[str]:
+    tips = []
+    if _is_wet(weather_data):
+        tips.append("Expect precipitation - take an umbrella and prefer closed, water-resistant shoes.")
+    if weather_data.get("wind_speed", 0) >= WIND_CHILL_THRESHOLD:
+        tips.append("It will be windy, so it will feel colder than the thermometer says.")
+    temp_min, temp_max = weather_data.get("temp_min"), weather_data.get("temp_max")
+    if temp_min is not None and temp_max is not None and temp_max - temp_min >= 8:
+        tips.append(f"Temperatures range from {round(temp_min)}°C to {round(temp_max)}°C today - dress in layers.")
+    if temperature >= 25:
+        tips.append("Stay hydrated and choose breathable fabrics.")
+    elif temperature < 5:
+        tips.append("Cover your head and hands to stay warm.")
+    return tips
+
+def recommend_outfit(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Deterministic rule-based recommendation in the same schema as the LLM answer
+    """
+    temperature = effective_temperature(weather_data)
+
+    outfit: Dict[str, Any] = {}
+    for category, slot in CATEGORY_SLOTS.items():
+        ranked = rank_items(user_clothes.get(category, []), weather_data)
+        if ranked:
+            outfit[slot] = [ranked[0]["id"], describe(ranked[0])]
+    outfit["accessories"] = [
+        [item["id"], describe(item)]
+        for item in select_accessories(user_clothes.get("accessories", []), weather_data)
+    ]
+
+    summary = f"{weather_data['conditions']} with a feels-like temperature of {round(temperature)}°C."
+    if occasion:
+        summary += f" Outfit picked for: {occasion}."
+
+    return {
+        "summary": summary,
+        "outfit": outfit,
+        "tips": build_tips(weather_data, temperature),
+        "source": "rules"
+    }
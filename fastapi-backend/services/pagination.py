@@ -0,0 +1,36 @@
+import os
+from typing import Any, List, Optional, Sequence, Tuple
+
+# Page size bounds for the list endpoints
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+
+def fetch_page(db, table: str, conditions: Sequence[Tuple[str, Any]] = (),
+               after: Optional[int] = None, limit: int = PAGE_DEFAULT_LIMIT) -> Tuple[List, Optional[int]]:
+    """
+    Fetch one page of a table in id order, resuming after the given id (keyset
+    pagination), so deep pages cost the same as the first one instead of
+    re-reading skipped rows like OFFSET. conditions are (clause, value) pairs
+    with one %s each, written by the routers. Returns (rows, next_cursor),
+    with next_cursor None on the last page.
+    """
+    clauses = [clause for clause, _ in conditions]
+    params = [value for _, value in conditions]
+    if after is not None:
+        clauses.append("id > %s")
+        params.append(after)
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = db.cursor()
+    try:
+        # One extra row says whether another page exists, without a COUNT(*)
+        cursor.execute(f"SELECT * FROM {table}{where} ORDER BY id LIMIT %s", (*params, limit + 1))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # id is the first column of every paginated table
+        return rows, rows[-1][0]
+    return rows, None
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Any, Dict, Optional
+
+from services.cache import TTLCache
+
+# Inputs are quantized so near-identical weather collapses onto one entry
+RECOMMENDATION_TEMP_BAND = float(os.getenv("RECOMMENDATION_TEMP_BAND", "3"))  # °C per band
+RECOMMENDATION_WIND_BAND = float(os.getenv("RECOMMENDATION_WIND_BAND", "4"))  # m/s per band
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+RECOMMENDATION_CACHE_MAXSIZE = int(os.getenv("RECOMMENDATION_CACHE_MAXSIZE", "2048"))
+
+_cache = TTLCache(maxsize=RECOMMENDATION_CACHE_MAXSIZE, ttl=RECOMMENDATION_CACHE_TTL_SECONDS)
+
+def _normalize_text(value: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (value or "").strip().casefold())
+
+def weather_signature(weather_data: Dict[str, Any]) -> str:
+    """Quantize the weather into temperature band, condition and wind band"""
+    temperature = weather_data.get("feels_like", weather_data["temperature"])
+    temp_band = math.floor(temperature / RECOMMENDATION_TEMP_BAND)
+    wind_band = math.floor(weather_data.get("wind_speed", 0) / RECOMMENDATION_WIND_BAND)
+    return f"t{temp_band}|{_normalize_text(weather_data['conditions'])}|w{wind_band}"
+
+def inventory_hash(user_clothes: Dict[str, Any]) -> str:
+    payload = json.dumps(user_clothes, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def recommendation_key(weather_data: Dict[str, Any], user_clothes: Dict[str, Any], occasion: Optional[str] = None, preferences: Optional[str] = None) -> str:
+    parts = [
+        weather_signature(weather_data),
+        inventory_hash(user_clothes),
+        _normalize_text(occasion),
+        _normalize_text(preferences),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    return _cache.get(key)
+
+def put(key: str, recommendations: Dict[str, Any]):
+    _cache.set(key, recommendations)
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,63 @@
+import math
+import os
+from collections import Counter
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+# Bounds on the digest sent to the LLM, so prompt size doesn't grow with the result
+SUMMARY_SAMPLE_ROWS = int(os.getenv("NL_QUERY_SUMMARY_SAMPLE_ROWS", "5"))
+SUMMARY_TOP_VALUES = int(os.getenv("NL_QUERY_SUMMARY_TOP_VALUES", "5"))
+SUMMARY_MAX_COLUMNS = int(os.getenv("NL_QUERY_SUMMARY_MAX_COLUMNS", "20"))
+SUMMARY_MAX_VALUE_CHARS = int(os.getenv("NL_QUERY_SUMMARY_MAX_VALUE_CHARS", "80"))
+
+def _clip(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    if len(text) > SUMMARY_MAX_VALUE_CHARS:
+        return text[:SUMMARY_MAX_VALUE_CHARS - 3] + "..."
+    return text
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def _column_stats(values: List[Any]) -> Dict[str, Any]:
+    present = [value for value in values if value is not None]
+    stats: Dict[str, Any] = {"nulls": len(values) - len(present)}
+    if not present:
+        return stats
+
+    if all(_is_number(value) for value in present):
+        numbers = [float(value) for value in present]
+        stats.update(type="number", min=min(numbers), max=max(numbers), mean=round(math.fsum(numbers) / len(numbers), 2))
+    elif all(isinstance(value, (date, datetime, time)) for value in present):
+        stats.update(type="date", min=_clip(min(present)), max=_clip(max(present)))
+    else:
+        stats["type"] = "text"
+
+    counts = Counter(str(value) for value in present)
+    stats["distinct"] = len(counts)
+    if stats.get("type") != "number" or len(counts) <= SUMMARY_TOP_VALUES:
+        stats["top_values"] = [[_clip(value), count] for value, count in counts.most_common(SUMMARY_TOP_VALUES)]
+    return stats
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reduce a result set to a bounded digest for an LLM prompt: the row count,
+    per-column statistics (nulls, numeric/date ranges, distinct and most common
+    values) and the first few rows, with long values clipped
+    """
+    if not results:
+        return {"row_count": 0, "columns": {}, "sample_rows": []}
+
+    all_columns = list(results[0].keys())
+    columns = all_columns[:SUMMARY_MAX_COLUMNS]
+    digest = {
+        "row_count": len(results),
+        "columns": {column: _column_stats([row.get(column) for row in results]) for column in columns},
+        "sample_rows": [{column: _clip(row.get(column)) for column in columns} for row in results[:SUMMARY_SAMPLE_ROWS]]
+    }
+    if len(all_columns) > len(columns):
+        digest["omitted_columns"] = len(all_columns) - len(columns)
+    return digest
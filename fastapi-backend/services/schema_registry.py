@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from db import connection
+
+logger = logging.getLogger(__name__)
+
+# How often to compare the catalog fingerprint, so migrations are picked up without a restart
+SCHEMA_CHECK_SECONDS = float(os.getenv("SCHEMA_CHECK_SECONDS", "30"))
+# Tables never shown to the LLM
+SCHEMA_HIDDEN_TABLES = {"alembic_version"}
+# Column names too common to say which table a question is about
+GENERIC_COLUMNS = {"id", "name", "title", "description", "status", "date"}
+
+COLUMNS_QUERY = """
+SELECT c.table_name, c.column_name, c.data_type, c.is_nullable
+FROM information_schema.columns c
+JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+ORDER BY c.table_name, c.ordinal_position
+"""
+
+CONSTRAINTS_QUERY = """
+SELECT tc.table_name, kcu.column_name, tc.constraint_type, ccu.table_name AS ref_table, ccu.column_name AS ref_column
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+  ON kcu.constraint_name = tc.constraint_name AND kcu.table_schema = tc.table_schema
+LEFT JOIN information_schema.constraint_column_usage ccu
+  ON tc.constraint_type = 'FOREIGN KEY' AND ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+WHERE tc.table_schema = 'public' AND tc.constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY')
+"""
+
+# Single-column CHECK constraints, e.g. the allowed reservation_type codes
+CHECKS_QUERY = """
+SELECT c.relname, a.attname, pg_get_constraintdef(pc.oid)
+FROM pg_constraint pc
+JOIN pg_class c ON c.oid = pc.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = pc.conrelid AND a.attnum = pc.conkey[1]
+WHERE n.nspname = 'public' AND pc.contype = 'c' AND array_length(pc.conkey, 1) = 1
+ORDER BY c.relname, pc.conname
+"""
+
+# Column comments (COMMENT ON COLUMN), which carry meanings such as code values
+COMMENTS_QUERY = """
+SELECT c.relname, a.attname, col_description(c.oid, a.attnum)
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public' AND c.relkind = 'r' AND a.attnum > 0 AND NOT a.attisdropped
+  AND col_description(c.oid, a.attnum) IS NOT NULL
+"""
+
+# Changes whenever a public table, column, nullability, comment or key/check constraint is added, dropped, renamed or altered
+FINGERPRINT_QUERY = """
+SELECT md5(
+  (SELECT coalesce(string_agg(c.relname || '.' || a.attname || ':' || a.atttypid || ':' || a.attnotnull || ':' || coalesce(col_description(c.oid, a.attnum), ''), ',' ORDER BY c.relname, a.attnum), '')
+   FROM pg_attribute a
+   JOIN pg_class c ON c.oid = a.attrelid
+   JOIN pg_namespace n ON n.oid = c.relnamespace
+   WHERE n.nspname = 'public' AND c.relkind = 'r' AND a.attnum > 0 AND NOT a.attisdropped)
+  || '|' ||
+  (SELECT coalesce(string_agg(pc.conname || ':' || pc.contype || ':' || pg_get_constraintdef(pc.oid), ',' ORDER BY pc.conname), '')
+   FROM pg_constraint pc
+   JOIN pg_namespace n ON n.oid = pc.connamespace
+   WHERE n.nspname = 'public' AND pc.contype IN ('p', 'f', 'c'))
+)
+"""
+
+_TYPE_ABBREVIATIONS = {
+    "character varying": "varchar",
+    "character": "char",
+    "integer": "int",
+    "bigint": "bigint",
+    "smallint": "smallint",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+    "time without time zone": "time",
+    "double precision": "float8",
+    "boolean": "bool",
+}
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    data_type: str
+    nullable: bool
+    primary_key: bool = False
+    references: Optional[str] = None
+    checks: Tuple[str, ...] = ()
+    comment: Optional[str] = None
+
+    def render(self) -> str:
+        text = f"{self.name} {_TYPE_ABBREVIATIONS.get(self.data_type, self.data_type)}"
+        if self.primary_key:
+            text += " PK"
+        if self.references:
+            text += f" FK {self.references}"
+        for check in self.checks:
+            text += f" {check}"
+        if self.comment:
+            text += f" /* {self.comment} */"
+        return text
+
+@dataclass
+class SchemaSnapshot:
+    """Introspected public schema with a compact rendering for prompts"""
+    tables: Dict[str, List[Column]]
+    fingerprint: Optional[str] = None
+    version: str = field(init=False)
+
+    def __post_init__(self):
+        self.version = hashlib.sha256(repr(self.tables).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_rows(cls, columns: Iterable[Sequence[Any]], constraints: Iterable[Sequence[Any]], fingerprint: Optional[str] = None,
+                  checks: Iterable[Sequence[Any]] = (), comments: Iterable[Sequence[Any]] = ()) -> "SchemaSnapshot":
+        column_checks: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        for table_name, column_name, definition in checks:
+            column_checks[(table_name, column_name)] = column_checks.get((table_name, column_name), ()) + (definition,)
+        column_comments = {(table_name, column_name): comment for table_name, column_name, comment in comments}
+
+        primary_keys = set()
+        references = {}
+        for table_name, column_name, constraint_type, ref_table, ref_column in constraints:
+            if constraint_type == "PRIMARY KEY":
+                primary_keys.add((table_name, column_name))
+            elif ref_table:
+                references[(table_name, column_name)] = f"{ref_table}.{ref_column}"
+
+        tables: Dict[str, List[Column]] = {}
+        for table_name, column_name, data_type, is_nullable in columns:
+            if table_name in SCHEMA_HIDDEN_TABLES:
+                continue
+            tables.setdefault(table_name, []).append(Column(
+                name=column_name,
+                data_type=data_type,
+                nullable=is_nullable == "YES",
+                primary_key=(table_name, column_name) in primary_keys,
+                references=references.get((table_name, column_name)),
+                checks=column_checks.get((table_name, column_name), ()),
+                comment=column_comments.get((table_name, column_name))
+            ))
+        return cls(tables=tables, fingerprint=fingerprint)
+
+    def render(self, tables: Optional[Iterable[str]] = None) -> str:
+        """One line per table: name(column type [PK] [FK table.column] [CHECK (...)] [/* comment */], ...)"""
+        names = list(self.tables) if tables is None else [name for name in tables if name in self.tables]
+        lines = [f"{name}({', '.join(column.render() for column in self.tables[name])})" for name in names]
+        return "PostgreSQL tables:\n" + "\n".join(lines)
+
+    def relevant_tables(self, query: str) -> List[str]:
+        """
+        Tables a question mentions by table or column name (singular or
+        plural), plus the tables they reference so joins can be written.
+        Falls back to every table when nothing matches.
+        """
+        words = set(re.findall(r"[a-z_]+", query.casefold()))
+        words |= {word[:-1] for word in words if word.endswith("s")}
+
+        def mentioned(name: str) -> bool:
+            name = name.casefold()
+            return name in words or name.rstrip("s") in words or name.replace("_", " ") in query.casefold()
+
+        matched = [name for name, columns in self.tables.items()
+                   if mentioned(name) or any(column.name not in GENERIC_COLUMNS and mentioned(column.name) for column in columns)]
+        if not matched:
+            return list(self.tables)
+
+        related = {column.references.split(".")[0] for name in matched for column in self.tables[name] if column.references}
+        return [name for name in self.tables if name in matched or name in related]
+
+    @cached_property
+    def grouped(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Columns grouped by table, in the shape the /schema endpoint returns"""
+        return {
+            name: [{"column_name": c.name, "data_type": c.data_type, "is_nullable": "YES" if c.nullable else "NO"} for c in columns]
+            for name, columns in self.tables.items()
+        }
+
+_snapshot: Optional[SchemaSnapshot] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def _fingerprint(cur) -> str:
+    cur.execute(FINGERPRINT_QUERY)
+    return cur.fetchone()[0]
+
+def _introspect(cur, fingerprint: str) -> SchemaSnapshot:
+    cur.execute(COLUMNS_QUERY)
+    columns = cur.fetchall()
+    cur.execute(CONSTRAINTS_QUERY)
+    constraints = cur.fetchall()
+    cur.execute(CHECKS_QUERY)
+    checks = cur.fetchall()
+    cur.execute(COMMENTS_QUERY)
+    comments = cur.fetchall()
+    snapshot = SchemaSnapshot.from_rows(columns, constraints, fingerprint, checks, comments)
+    logger.info(f"Loaded schema for {len(snapshot.tables)} tables (version {snapshot.version})")
+    return snapshot
+
+def get() -> SchemaSnapshot:
+    """
+    Return the cached schema. Every SCHEMA_CHECK_SECONDS a one-row catalog
+    fingerprint is compared and the schema is re-introspected only if it changed.
+    """
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < SCHEMA_CHECK_SECONDS:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < SCHEMA_CHECK_SECONDS:
+            return _snapshot
+        with connection() as conn:
+            with conn.cursor() as cur:
+                fingerprint = _fingerprint(cur)
+                if _snapshot is None or _snapshot.fingerprint != fingerprint:
+                    _snapshot = _introspect(cur, fingerprint)
+        _checked_at = time.monotonic()
+        return _snapshot
+
+def invalidate():
+    """Force the next get() to re-check the catalog, e.g. right after a migration"""
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
+
+def clear():
+    global _snapshot, _checked_at
+    with _lock:
+        _snapshot = None
+        _checked_at = 0.0
@@ -0,0 +1,130 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services import llm
+
+logger = logging.getLogger(__name__)
+
+NL_SEMANTIC_CACHE_ENABLED = os.getenv("NL_SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity a cached question needs to reach for its SQL to be reused
+NL_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("NL_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+NL_SEMANTIC_CACHE_MAXSIZE = int(os.getenv("NL_SEMANTIC_CACHE_MAXSIZE", "2048"))
+
+class VectorIndex:
+    """
+    Fixed-capacity in-process cosine similarity index. Vectors live in one
+    preallocated NumPy matrix and are searched brute force; once full, the
+    oldest entry is overwritten.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._vectors = None
+        self._values: List[Any] = [None] * maxsize
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def add(self, vector: Sequence[float], value: Any):
+        import numpy as np
+
+        vector = _normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+                self._values = [None] * self.maxsize
+                self._count = self._next = 0
+            self._vectors[self._next] = vector
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.maxsize
+            self._count = min(self._count + 1, self.maxsize)
+
+    def search(self, vector: Sequence[float]) -> Optional[Tuple[float, Any]]:
+        """Return (similarity, value) of the closest entry, or None when empty"""
+        import numpy as np
+
+        vector = _normalize(vector)
+        with self._lock:
+            if self._count == 0 or self._vectors.shape[1] != len(vector):
+                return None
+            scores = self._vectors[:self._count] @ vector
+            best = int(np.argmax(scores))
+            return float(scores[best]), self._values[best]
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._values = [None] * self.maxsize
+            self._count = self._next = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+def _normalize(vector: Sequence[float]):
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+_index = VectorIndex(NL_SEMANTIC_CACHE_MAXSIZE)
+_stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+def literals_match(sql_query: str, query: str) -> bool:
+    """
+    Guard against paraphrases that only differ in the entity asked about
+    ("employees in AAP" vs "employees in CBD"): every string and number literal
+    in the cached SQL must also appear in the new question, as a whole word or
+    number (5000 must not match "50000", nor 'AA' match "AAP").
+    """
+    query = query.casefold()
+    literals = re.findall(r"'((?:[^']|'')*)'", sql_query)
+    literals += re.findall(r"(?<![\w.\"])(\d+(?:\.\d+)?)(?![\w.])", re.sub(r"'(?:[^']|'')*'", "", sql_query))
+    return all(_contains_token(query, literal.replace("''", "'").strip("%").casefold()) for literal in literals)
+
+def _contains_token(text: str, literal: str) -> bool:
+    if not literal:
+        return True
+    return re.search(rf"(?<![\w.]){re.escape(literal)}(?!\w|\.\d)", text) is not None
+
+async def embed(query: str) -> Optional[List[float]]:
+    """Embed a question, or return None when embeddings are unavailable"""
+    try:
+        return await llm.embed(query)
+    except Exception as e:
+        logger.warning(f"Query embedding failed, skipping the semantic cache: {str(e)}")
+        return None
+
+def lookup(embedding: Sequence[float], query: str, schema_version: str) -> Optional[str]:
+    """Return cached SQL for a paraphrase of the question, if one is close enough"""
+    match = _index.search(embedding)
+    if match is not None and match[0] >= NL_SEMANTIC_CACHE_THRESHOLD:
+        version, sql_query = match[1]
+        if version == schema_version and literals_match(sql_query, query):
+            _stats["hits"] += 1
+            return sql_query
+        _stats["rejected"] += 1
+    _stats["misses"] += 1
+    return None
+
+def add(embedding: Sequence[float], sql_query: str, schema_version: str):
+    _index.add(embedding, (schema_version, sql_query))
+
+def stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "enabled": NL_SEMANTIC_CACHE_ENABLED,
+        "size": len(_index),
+        "maxsize": NL_SEMANTIC_CACHE_MAXSIZE,
+        "threshold": NL_SEMANTIC_CACHE_THRESHOLD,
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0
+    }
+
+def clear():
+    _index.clear()
+    for key in _stats:
+        _stats[key] = 0
@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Optional
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+NL_SQL_CACHE_MAXSIZE = int(os.getenv("NL_SQL_CACHE_MAXSIZE", "1024"))
+# Optional JSON file the cache is loaded from on startup and saved to on shutdown
+NL_SQL_CACHE_PATH = os.getenv("NL_SQL_CACHE_PATH")
+
+_cache = TTLCache(maxsize=NL_SQL_CACHE_MAXSIZE)
+
+def normalize_query(query: str) -> str:
+    """Normalize a question so case, spacing and trailing punctuation don't matter"""
+    query = re.sub(r"\s+", " ", query.strip().casefold())
+    return query.rstrip(" ?!.")
+
+def cache_key(query: str, schema_version: str) -> str:
+    """Entries are tied to the version of the schema the SQL was generated against"""
+    return f"{schema_version}:{normalize_query(query)}"
+
+def get(key: str) -> Optional[str]:
+    return _cache.get(key)
+
+def put(key: str, sql_query: str):
+    _cache.set(key, sql_query)
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+def clear():
+    _cache.clear()
+
+def load(path: Optional[str] = None) -> int:
+    """Load persisted entries, keeping their LRU order. Returns how many were loaded."""
+    path = path or NL_SQL_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not load NL-to-SQL cache from {path}: {str(e)}")
+        return 0
+
+    for key, sql_query in entries:
+        _cache.set(key, sql_query)
+    return len(entries)
+
+def save(path: Optional[str] = None):
+    path = path or NL_SQL_CACHE_PATH
+    if not path:
+        return
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": _cache.items()}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save NL-to-SQL cache to {path}: {str(e)}")
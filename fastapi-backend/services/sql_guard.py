@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import psycopg2.errors
+
+from services import sql_validator
+
+logger = logging.getLogger(__name__)
+
+# Budgets for LLM-generated SQL, checked against the planner's estimates before running it
+NL_QUERY_MAX_PLAN_COST = float(os.getenv("NL_QUERY_MAX_PLAN_COST", "100000"))
+NL_QUERY_MAX_PLAN_ROWS = float(os.getenv("NL_QUERY_MAX_PLAN_ROWS", "1000000"))
+NL_QUERY_STATEMENT_TIMEOUT_MS = int(os.getenv("NL_QUERY_STATEMENT_TIMEOUT_MS", "5000"))
+# Appended to queries without a top-level LIMIT/FETCH
+NL_QUERY_DEFAULT_LIMIT = int(os.getenv("NL_QUERY_DEFAULT_LIMIT", "1000"))
+
+_stats = {"checked": 0, "rejected_cost": 0, "rejected_rows": 0, "timed_out": 0}
+_stats_lock = threading.Lock()
+
+class QueryRejected(ValueError):
+    """Raised when a query's plan is over the cost or row-estimate budget"""
+
+class QueryTimeout(Exception):
+    """Raised when a query runs past the statement timeout"""
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+# A statement-ending semicolon followed only by whitespace and comments
+_TERMINATOR_RE = re.compile(r";(?:\s|--[^\n]*|/\*.*?\*/)*$", re.DOTALL)
+
+def strip_terminator(sql: str) -> str:
+    """Drop the trailing semicolon, and any comments after it, so the query can be wrapped or extended"""
+    return _TERMINATOR_RE.sub("", sql.strip()).rstrip()
+
+def with_limit(sql: str, limit: Optional[int] = None) -> str:
+    """
+    Strip the trailing semicolon and add a LIMIT unless the query already
+    bounds its rows. The LIMIT goes on its own line so a trailing
+    "-- comment" cannot swallow it.
+    """
+    limit = NL_QUERY_DEFAULT_LIMIT if limit is None else limit
+    sql = strip_terminator(sql)
+
+    depth = 0
+    for token in sql_validator.tokenize(sql):
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif depth == 0 and token.keyword in ("limit", "fetch"):
+            return sql
+    return f"{sql}\nLIMIT {int(limit)}"
+
+def guard(cur, sql: str):
+    """
+    Put the current transaction in read-only mode with a statement timeout,
+    then EXPLAIN the query and reject it if the plan is over budget. Must run
+    before anything else in the transaction.
+    """
+    cur.execute(f"SET TRANSACTION READ ONLY; SET LOCAL statement_timeout = {int(NL_QUERY_STATEMENT_TIMEOUT_MS)}")
+    _count("checked")
+
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = cur.fetchone()
+    plan = plan[0] if not isinstance(plan, dict) else next(iter(plan.values()))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    if root["Total Cost"] > NL_QUERY_MAX_PLAN_COST:
+        _count("rejected_cost")
+        raise QueryRejected(f"Query is too expensive (estimated cost {root['Total Cost']:.0f} > {NL_QUERY_MAX_PLAN_COST:.0f})")
+    if root["Plan Rows"] > NL_QUERY_MAX_PLAN_ROWS:
+        _count("rejected_rows")
+        raise QueryRejected(f"Query returns too many rows (estimated {root['Plan Rows']:.0f} > {NL_QUERY_MAX_PLAN_ROWS:.0f})")
+
+@contextmanager
+def statement_timeouts():
+    """Count statement timeouts raised in the block and re-raise them as QueryTimeout"""
+    try:
+        yield
+    except psycopg2.errors.QueryCanceled as e:
+        _count("timed_out")
+        raise QueryTimeout(f"Query exceeded the {NL_QUERY_STATEMENT_TIMEOUT_MS} ms statement timeout") from e
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        counts = dict(_stats)
+    return {
+        **counts,
+        "max_plan_cost": NL_QUERY_MAX_PLAN_COST,
+        "max_plan_rows": NL_QUERY_MAX_PLAN_ROWS,
+        "statement_timeout_ms": NL_QUERY_STATEMENT_TIMEOUT_MS,
+        "default_limit": NL_QUERY_DEFAULT_LIMIT
+    }
+
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
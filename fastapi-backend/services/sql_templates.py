@@ -0,0 +1,174 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Pattern, Sequence, Tuple
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# How long the department and employee names templates are checked against stay cached
+TEMPLATE_LOOKUP_TTL_SECONDS = float(os.getenv("NL_TEMPLATE_LOOKUP_TTL_SECONDS", "300"))
+
+@dataclass(frozen=True)
+class SQLTemplate:
+    """
+    A common NL intent answered by a server-side prepared statement. The
+    patterns run against the normalized question; parse turns the named
+    groups into the statement's positional parameters, or None to reject.
+    lookup, if set, returns the lowercased values the first parameter must be
+    one of; anything else is left to the LLM.
+    """
+    name: str
+    patterns: Sequence[Pattern]
+    param_types: Sequence[str]
+    sql: str
+    parse: Callable[[Dict[str, str]], Optional[Tuple[Any, ...]]]
+    lookup: Optional[str] = None
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    template: SQLTemplate
+    params: Tuple[Any, ...]
+
+    @property
+    def display_sql(self) -> str:
+        """The statement with its parameters spelled out, for responses and logs"""
+        return f"{self.template.sql.strip()} -- params: {list(map(str, self.params))}"
+
+_VERB = r"(?:(?:show|list|get|find|display|give)\s+(?:me\s+)?)?(?:all\s+)?(?:the\s+)?"
+_DATE = r"\d{4}-\d{2}-\d{2}"
+
+def _department(groups: Dict[str, str]) -> Optional[Tuple[Any, ...]]:
+    return (groups["department"].strip(),)
+
+def _date_range(groups: Dict[str, str]) -> Optional[Tuple[Any, ...]]:
+    try:
+        start, end = date.fromisoformat(groups["start"]), date.fromisoformat(groups["end"])
+    except ValueError:
+        return None
+    return (start, end) if start <= end else None
+
+def _person(groups: Dict[str, str]) -> Optional[Tuple[Any, ...]]:
+    return (groups["person"].strip(),)
+
+TEMPLATES: List[SQLTemplate] = [
+    SQLTemplate(
+        name="employees_by_department",
+        patterns=[
+            re.compile(rf"^{_VERB}employees\s+(?:in|of|from|at)\s+(?:the\s+)?(?P<department>[\w&-]+)(?:\s+(?:department|dept))?$"),
+            re.compile(rf"^who\s+works?\s+(?:in|at|for)\s+(?:the\s+)?(?P<department>[\w&-]+)(?:\s+(?:department|dept))?$"),
+            re.compile(rf"^{_VERB}(?P<department>[\w&-]+)\s+(?:department\s+)?employees$"),
+        ],
+        param_types=["text"],
+        sql="""
+        SELECT e.id, e.name, e.salary, d.name AS department_name
+        FROM "employees" e
+        JOIN "departments" d ON e.dept_id = d.id
+        WHERE lower(d.name) = lower($1)
+        ORDER BY e.name
+        """,
+        parse=_department,
+        lookup='SELECT lower(name) FROM "departments"'
+    ),
+    SQLTemplate(
+        name="reservations_in_date_range",
+        patterns=[
+            re.compile(rf"^{_VERB}reservations\s+(?:from|between)\s+(?P<start>{_DATE})\s+(?:to|and|until)\s+(?P<end>{_DATE})$"),
+        ],
+        param_types=["date", "date"],
+        sql="""
+        SELECT r.id, e.name AS employee_name, r.start_date, r.end_date, r.work_date, r.reservation_type
+        FROM "reservations" r
+        JOIN "employees" e ON r.employee_id = e.id
+        WHERE COALESCE(r.start_date, r.work_date) <= $2 AND COALESCE(r.end_date, r.work_date) >= $1
+        ORDER BY COALESCE(r.start_date, r.work_date), e.name
+        """,
+        parse=_date_range
+    ),
+    SQLTemplate(
+        name="appointments_for_person",
+        patterns=[
+            re.compile(rf"^{_VERB}appointments\s+(?:for|of|with)\s+(?P<person>[\w' -]+?)$"),
+            re.compile(rf"^{_VERB}(?P<person>[\w -]+?)'s\s+appointments$"),
+        ],
+        param_types=["text"],
+        sql="""
+        SELECT e.name AS employee_name, a.title, a.description, a.start_time, a.end_time, a.status
+        FROM "appointments" a
+        JOIN "employees" e ON a.employee_id = e.id
+        WHERE position(lower($1) in lower(e.name)) > 0
+        ORDER BY a.start_time
+        """,
+        parse=_person,
+        # Full names and each part of them, since the statement matches on part of the name
+        lookup="""
+        SELECT lower(name) FROM "employees"
+        UNION SELECT regexp_split_to_table(lower(name), '\\s+') FROM "employees"
+        """
+    ),
+]
+
+def match(normalized_query: str) -> Optional[TemplateMatch]:
+    """Return the first template whose pattern matches the normalized question"""
+    for template in TEMPLATES:
+        for pattern in template.patterns:
+            found = pattern.match(normalized_query)
+            if found is None:
+                continue
+            params = template.parse(found.groupdict())
+            if params is not None:
+                return TemplateMatch(template, params)
+    return None
+
+_lookups = TTLCache(maxsize=64, ttl=TEMPLATE_LOOKUP_TTL_SECONDS)
+
+def known_values(conn, template: SQLTemplate) -> FrozenSet[str]:
+    """The values a template's parameter may take, read once per TTL"""
+    values = _lookups.get(template.name)
+    if values is None:
+        with conn.cursor() as cur:
+            cur.execute(template.lookup)
+            values = frozenset(row[0] for row in cur.fetchall() if row[0])
+        _lookups.set(template.name, values)
+    return values
+
+def accepts(conn, template_match: TemplateMatch) -> bool:
+    """
+    Whether a match names a department or person that exists. The patterns
+    alone also catch "show active employees" or "appointments for today",
+    which must go to the LLM rather than return an empty template result.
+    """
+    template = template_match.template
+    if template.lookup is None:
+        return True
+    return str(template_match.params[0]).lower() in known_values(conn, template)
+
+def clear_lookups():
+    _lookups.clear()
+
+def _prepare(cur, template: SQLTemplate):
+    cur.execute(f"PREPARE {template.name} ({', '.join(template.param_types)}) AS {template.sql}")
+
+def execute(conn, template_match: TemplateMatch) -> List[Dict[str, Any]]:
+    """
+    Run a matched template as a prepared statement on the given connection.
+    Statements are prepared lazily, once per pooled connection.
+    """
+    template = template_match.template
+    placeholders = ", ".join(["%s"] * len(template_match.params))
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        try:
+            cur.execute(f"EXECUTE {template.name} ({placeholders})", template_match.params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            conn.rollback()
+            _prepare(cur, template)
+            cur.execute(f"EXECUTE {template.name} ({placeholders})", template_match.params)
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
@@ -0,0 +1,251 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+# Tables LLM-generated SQL may read
+DEFAULT_ALLOWED_TABLES: FrozenSet[str] = frozenset({
+    "employees", "hiring_personal", "departments", "reservations", "appointments", "schedules"
+})
+
+# Statement verbs that write; checked where a statement starts (the query itself and each CTE body)
+WRITE_KEYWORDS = {
+    "insert", "update", "delete", "merge", "drop", "alter", "create", "truncate", "grant",
+    "revoke", "copy", "lock", "vacuum", "call", "refresh", "reindex", "cluster"
+}
+
+# Functions with side effects or access outside the allowed tables
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_read_file",
+    "pg_read_binary_file", "pg_ls_dir", "pg_stat_file", "set_config", "lo_import", "lo_export",
+    "dblink", "dblink_exec", "nextval", "setval", "query_to_xml", "query_to_json"
+}
+
+# Keywords that end the table list of a FROM clause
+CLAUSE_KEYWORDS = {
+    "where", "group", "order", "limit", "offset", "having", "window", "union", "intersect",
+    "except", "fetch", "for", "on", "using", "returning"
+}
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>[eE]'(?:[^'\\]|''|\\.)*'|'(?:[^']|'')*')
+  | (?P<dollar>\$(?P<tag>[A-Za-z_]\w*)?\$.*?\$(?P=tag)\$)
+  | (?P<quoted>"(?:[^"]|"")+")
+  | (?P<param>\$\d+|%\(\w+\)s|%s)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_][\w$]*)
+  | (?P<op>::|<=|>=|<>|!=|\|\||[-+*/%<>=~!@#^&|`?.,;()\[\]{}:])
+""", re.VERBOSE | re.DOTALL)
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    value: str
+
+    @property
+    def keyword(self) -> Optional[str]:
+        return self.value.lower() if self.kind == "word" else None
+
+    @property
+    def name(self) -> Optional[str]:
+        """Identifier text for bare or quoted names"""
+        if self.kind == "word":
+            return self.value.lower()
+        if self.kind == "quoted":
+            return self.value[1:-1].replace('""', '"')
+        return None
+
+@dataclass(frozen=True)
+class SQLAnalysis:
+    read_only: bool
+    tables: Tuple[str, ...]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class SQLSyntaxError(ValueError):
+    """Raised when a statement cannot be tokenized"""
+
+def tokenize(sql: str) -> List[Token]:
+    """Split SQL into tokens, dropping whitespace and comments"""
+    tokens = []
+    position = 0
+    while position < len(sql):
+        found = _TOKEN_RE.match(sql, position)
+        if found is None:
+            raise SQLSyntaxError(f"Unexpected character {sql[position]!r} at position {position}")
+        kind = found.lastgroup if found.lastgroup != "tag" else "dollar"
+        if kind not in ("space", "comment"):
+            tokens.append(Token("string" if kind == "dollar" else kind, found.group()))
+        position = found.end()
+    return tokens
+
+def _skip_parens(tokens: List[Token], i: int) -> int:
+    """Index just past the parenthesized group starting at tokens[i]"""
+    depth = 0
+    while i < len(tokens):
+        if tokens[i].value == "(":
+            depth += 1
+        elif tokens[i].value == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+def _ctes(tokens: List[Token]) -> List[Tuple[str, Optional[str]]]:
+    """(name, first keyword of the body) for each CTE of a leading WITH clause"""
+    ctes: List[Tuple[str, Optional[str]]] = []
+    if not tokens or tokens[0].keyword != "with":
+        return ctes
+
+    i = 2 if len(tokens) > 1 and tokens[1].keyword == "recursive" else 1
+    while i < len(tokens) and tokens[i].name:
+        name = tokens[i].name
+        i += 1
+        # name [(columns)] AS [[NOT] MATERIALIZED] (body)
+        if i < len(tokens) and tokens[i].value == "(":
+            i = _skip_parens(tokens, i)
+        while i < len(tokens) and tokens[i].keyword in ("as", "not", "materialized"):
+            i += 1
+        ctes.append((name, tokens[i + 1].keyword if i + 1 < len(tokens) else None))
+        i = _skip_parens(tokens, i)
+        if i < len(tokens) and tokens[i].value == ",":
+            i += 1
+        else:
+            break
+    return ctes
+
+def _write_keyword(tokens: List[Token], first: Optional[str]) -> Optional[str]:
+    """
+    The write verb of a statement, looked for only where it can occur: at
+    the start of the statement or of a CTE body, SELECT ... INTO in a select
+    list, and FOR UPDATE/SHARE locking clauses. Elsewhere the same words are
+    ordinary names ("AS copy", "SELECT lock").
+    """
+    if first in WRITE_KEYWORDS:
+        return first
+    for _, body_keyword in _ctes(tokens):
+        if body_keyword in WRITE_KEYWORDS:
+            return body_keyword
+
+    in_select_list = [False]
+    for i, token in enumerate(tokens):
+        keyword = token.keyword
+        previous = tokens[i - 1].keyword if i else None
+        if token.value == "(":
+            in_select_list.append(False)
+        elif token.value == ")":
+            if len(in_select_list) > 1:
+                in_select_list.pop()
+        elif keyword == "select":
+            in_select_list[-1] = True
+        elif keyword in ("from", "where", "group", "order", "limit", "union", "intersect", "except"):
+            in_select_list[-1] = False
+        elif keyword == "into" and in_select_list[-1] and previous != "as":
+            return "into"
+        elif keyword == "for" and i + 1 < len(tokens) and tokens[i + 1].keyword in ("update", "share", "no", "key"):
+            # FOR UPDATE / FOR NO KEY UPDATE / FOR SHARE / FOR KEY SHARE
+            return "share" if any(t.keyword == "share" for t in tokens[i + 1:i + 4]) else "update"
+    return None
+
+def _referenced_tables(tokens: List[Token]) -> List[str]:
+    """
+    Tables named in FROM and JOIN clauses, at any nesting level. A FROM only
+    counts where the same parenthesis level has a SELECT, which leaves out
+    EXTRACT(... FROM ...) and similar function syntax.
+    """
+    tables = []
+    selects = [False]
+    in_from = [False]
+    expect_table = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        keyword = token.keyword
+        if token.value == "(":
+            next_keyword = tokens[i + 1].keyword if i + 1 < len(tokens) else None
+            if expect_table and next_keyword not in ("select", "values", "with"):
+                # A parenthesized table or join group, e.g. FROM (a JOIN b ON ...): its names are tables too
+                selects.append(True)
+                in_from.append(True)
+            else:
+                selects.append(False)
+                in_from.append(False)
+                expect_table = False
+        elif token.value == ")":
+            if len(selects) > 1:
+                selects.pop()
+                in_from.pop()
+        elif keyword == "select":
+            selects[-1] = True
+            in_from[-1] = False
+        elif keyword in ("from", "join") and selects[-1]:
+            expect_table = True
+            in_from[-1] = True
+        elif expect_table and keyword in ("only", "lateral"):
+            pass
+        elif expect_table and token.name is not None:
+            name_tokens = [token]
+            while i + 2 < len(tokens) and tokens[i + 1].value == "." and tokens[i + 2].name is not None:
+                name_tokens.append(tokens[i + 2])
+                i += 2
+            # A name followed by "(" is a set-returning function, not a table
+            if not (i + 1 < len(tokens) and tokens[i + 1].value == "("):
+                tables.append(".".join(t.name for t in name_tokens))
+            expect_table = False
+        elif token.value == "," and in_from[-1]:
+            expect_table = True
+        elif keyword in CLAUSE_KEYWORDS:
+            in_from[-1] = False
+            expect_table = False
+        else:
+            expect_table = False
+        i += 1
+    return tables
+
+@lru_cache(maxsize=2048)
+def analyze(sql: str, allowed_tables: FrozenSet[str] = DEFAULT_ALLOWED_TABLES) -> SQLAnalysis:
+    """
+    Classify a statement in one pass: it must be a single read-only SELECT
+    (optionally with a WITH clause) that only reads allowed tables. Results
+    are cached per SQL string.
+    """
+    try:
+        tokens = tokenize(sql)
+    except SQLSyntaxError as e:
+        return SQLAnalysis(read_only=False, tables=(), error=str(e))
+
+    if tokens and tokens[-1].value == ";":
+        tokens = tokens[:-1]
+    if not tokens:
+        return SQLAnalysis(read_only=False, tables=(), error="Empty SQL statement")
+    if any(token.value == ";" for token in tokens):
+        return SQLAnalysis(read_only=False, tables=(), error="Multiple SQL statements are not allowed")
+
+    first = next((token.keyword for token in tokens if token.value != "("), None)
+    write_keyword = _write_keyword(tokens, first)
+    read_only = first in ("select", "with") and write_keyword is None
+    tables = tuple(dict.fromkeys(_referenced_tables(tokens)))
+
+    if first not in ("select", "with"):
+        return SQLAnalysis(read_only, tables, "Only SELECT queries are allowed for safety reasons")
+    if write_keyword is not None:
+        return SQLAnalysis(read_only, tables, f"Dangerous SQL keyword '{write_keyword}' is not allowed")
+
+    # Match the normalized name, so "pg_read_file"(...) and pg_catalog.pg_sleep(...) are caught too
+    for i, token in enumerate(tokens[:-1]):
+        if token.name in FORBIDDEN_FUNCTIONS and tokens[i + 1].value == "(":
+            return SQLAnalysis(read_only, tables, f"SQL function '{token.name}' is not allowed")
+
+    ctes = {name for name, _ in _ctes(tokens)}
+    for table in tables:
+        unqualified = table[len("public."):] if table.startswith("public.") else table
+        if unqualified not in allowed_tables and table not in ctes:
+            return SQLAnalysis(read_only, tables, f"Table '{table}' is not allowed")
+
+    return SQLAnalysis(read_only, tables)
@@ -0,0 +1,371 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Whisper model settings
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "false").lower() == "true"
+# Worker processes, each holding its own model; 0 runs inference on a thread in the API process
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+# Requests allowed to wait for a worker before new ones are rejected
+WHISPER_QUEUE_SIZE = int(os.getenv("WHISPER_QUEUE_SIZE", "16"))
+WHISPER_MAX_UPLOAD_BYTES = int(os.getenv("WHISPER_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Windows decoded together in one model call; also the most queued requests a worker takes at once
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "4"))
+# Fixed language code (e.g. "en") to skip the language detection pass; empty means detect
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "").strip() or None
+# RMS level below which a 20 ms frame counts as silence
+WHISPER_SILENCE_THRESHOLD = float(os.getenv("WHISPER_SILENCE_THRESHOLD", "0.01"))
+
+# Whisper expects mono audio at 16 kHz, in windows of 30 seconds
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+FRAME_SAMPLES = SAMPLE_RATE // 50
+# Keep a little audio around detected speech so word edges aren't clipped
+SILENCE_PADDING_SAMPLES = SAMPLE_RATE // 5
+# Look this far back from a window boundary for a quiet spot to cut at
+SPLIT_SEARCH_SAMPLES = 2 * SAMPLE_RATE
+
+_models: Dict[str, Any] = {}
+_load_times: Dict[str, float] = {}
+_lock = threading.Lock()
+
+class TranscriptionQueueFull(Exception):
+    """Raised when the transcription queue is at capacity"""
+
+class AudioTooLarge(Exception):
+    """Raised when an upload exceeds WHISPER_MAX_UPLOAD_BYTES"""
+
+def get_model(name: Optional[str] = None):
+    """
+    Return the Whisper model, loading it on first use. Every endpoint shares
+    the same instance. Raises ImportError when whisper is not installed.
+    """
+    name = name or WHISPER_MODEL
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                import whisper
+
+                start_time = time.perf_counter()
+                model = whisper.load_model(name)
+                _load_times[name] = round(time.perf_counter() - start_time, 3)
+                logger.info(f"Loaded Whisper model '{name}' in {_load_times[name]}s")
+                _models[name] = model
+    return model
+
+def use_fp16(model) -> bool:
+    """Half precision only on CUDA; on CPU whisper warns and falls back to fp32 on every decode"""
+    return str(model.device).startswith("cuda")
+
+def warmup_model() -> Tuple[int, Optional[float]]:
+    """
+    Load the model and run one decode on silence so the first request doesn't
+    pay for it. Returns (pid, load_time_seconds) for the parent's stats.
+    """
+    import numpy as np
+    import whisper
+
+    model = get_model()
+    audio = whisper.pad_or_trim(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    mel = whisper.log_mel_spectrogram(audio).to(model.device)
+    whisper.decode(model, mel, whisper.DecodingOptions(fp16=use_fp16(model)))
+    return os.getpid(), _load_times.get(WHISPER_MODEL)
+
+async def read_upload(file, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Read an UploadFile in chunks, refusing anything larger than max_bytes
+    """
+    max_bytes = WHISPER_MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise AudioTooLarge(f"Audio upload exceeds the {max_bytes} byte limit")
+
+def _decode_pcm_wav(data: bytes):
+    """Decode 16 kHz 16-bit PCM WAV directly; returns None for anything else"""
+    import numpy as np
+
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            if wav.getframerate() != SAMPLE_RATE or wav.getsampwidth() != 2:
+                return None
+            channels = wav.getnchannels()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    except (wave.Error, EOFError):
+        return None
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples.astype(np.float32) / 32768.0
+
+def decode_audio(data: bytes):
+    """
+    Decode uploaded audio bytes to a mono 16 kHz float32 NumPy array without
+    touching the disk. 16 kHz PCM WAV is parsed in-process; other formats are
+    piped through ffmpeg's stdin/stdout.
+    """
+    import numpy as np
+
+    audio = _decode_pcm_wav(data)
+    if audio is not None:
+        return audio
+
+    cmd = [
+        "ffmpeg", "-loglevel", "error", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "pipe:1"
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+def _frame_energy(audio):
+    """RMS energy of each 20 ms frame"""
+    import numpy as np
+
+    n_frames = len(audio) // FRAME_SAMPLES
+    frames = audio[:n_frames * FRAME_SAMPLES].reshape(n_frames, FRAME_SAMPLES)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def trim_silence(audio, threshold: Optional[float] = None):
+    """
+    Drop leading and trailing silence, keeping a short margin around the
+    speech. Returns an empty array when nothing is above the threshold.
+    """
+    import numpy as np
+
+    threshold = WHISPER_SILENCE_THRESHOLD if threshold is None else threshold
+    voiced = np.flatnonzero(_frame_energy(audio) > threshold)
+    if len(voiced) == 0:
+        return audio[:0]
+
+    start = max(voiced[0] * FRAME_SAMPLES - SILENCE_PADDING_SAMPLES, 0)
+    end = min((voiced[-1] + 1) * FRAME_SAMPLES + SILENCE_PADDING_SAMPLES, len(audio))
+    return audio[start:end]
+
+def split_windows(audio) -> List[Any]:
+    """
+    Split audio into windows of at most 30 seconds, cutting each one at the
+    quietest frame near its end so words aren't split across windows
+    """
+    import numpy as np
+
+    windows = []
+    start = 0
+    while len(audio) - start > WINDOW_SAMPLES:
+        search_start = start + WINDOW_SAMPLES - SPLIT_SEARCH_SAMPLES
+        energy = _frame_energy(audio[search_start:start + WINDOW_SAMPLES])
+        cut = search_start + (int(np.argmin(energy)) + 1) * FRAME_SAMPLES
+        windows.append(audio[start:cut])
+        start = cut
+    windows.append(audio[start:])
+    return windows
+
+def transcribe_batch(items: List[bytes]) -> List[Any]:
+    """
+    Transcribe several uploads of any length together. Silence is trimmed and
+    the rest is split into 30-second windows; windows from every upload share
+    the batched language detection and decode calls, then are stitched back
+    together per upload. Returns a (text, language) tuple for each upload, or
+    the exception raised while decoding it.
+    """
+    import torch
+    import whisper
+
+    results: List[Any] = [None] * len(items)
+    windows = []
+    for i, data in enumerate(items):
+        try:
+            audio = trim_silence(decode_audio(data))
+        except Exception as e:
+            results[i] = e
+            continue
+        if len(audio) == 0:
+            results[i] = ("", WHISPER_LANGUAGE)
+            continue
+        windows.extend((i, window) for window in split_windows(audio))
+    if not windows:
+        return results
+
+    model = get_model()
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(window))
+        for _, window in windows
+    ]).to(model.device)
+
+    if WHISPER_LANGUAGE:
+        languages = {i: WHISPER_LANGUAGE for i, _ in windows}
+    else:
+        # Detect each upload's language from its first window, in one pass
+        first_windows: Dict[int, int] = {}
+        for pos, (i, _) in enumerate(windows):
+            first_windows.setdefault(i, pos)
+        _, probs = model.detect_language(mels[list(first_windows.values())])
+        languages = {i: max(p, key=p.get) for i, p in zip(first_windows, probs)}
+
+    by_language: Dict[str, List[int]] = {}
+    for pos, (i, _) in enumerate(windows):
+        by_language.setdefault(languages[i], []).append(pos)
+
+    batch_size = max(WHISPER_BATCH_SIZE, 1)
+    fp16 = use_fp16(model)
+    texts: Dict[int, List[str]] = {i: [] for i in languages}
+    for language, positions in by_language.items():
+        options = whisper.DecodingOptions(language=language, fp16=fp16)
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            for pos, result in zip(batch, whisper.decode(model, mels[batch], options)):
+                texts[windows[pos][0]].append(result.text.strip())
+
+    for i, language in languages.items():
+        results[i] = " ".join(text for text in texts[i] if text), language
+    return results
+
+def transcribe_audio(data: bytes) -> Tuple[str, str]:
+    """
+    Transcribe uploaded audio bytes and return (text, detected_language)
+    """
+    result = transcribe_batch([data])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+# Worker pool: a bounded asyncio queue in front of the process pool, drained
+# by one dispatcher per worker so excess requests wait here, not in the executor.
+# A dispatcher hands everything already queued (up to WHISPER_BATCH_SIZE) to its
+# worker as one batch.
+
+_executor: Optional[ProcessPoolExecutor] = None
+_queue: Optional[asyncio.Queue] = None
+_dispatchers: List[asyncio.Task] = []
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# Model load time reported back by each worker process, keyed by pid
+_worker_load_times: Dict[int, float] = {}
+
+def _init_worker():
+    # Load the model when the worker process starts; errors resurface on the first job
+    try:
+        get_model()
+    except Exception as e:
+        logger.error(f"Failed to load Whisper model in worker: {str(e)}")
+
+def _ensure_started():
+    global _executor, _queue, _dispatchers, _loop
+    loop = asyncio.get_running_loop()
+    if _loop is loop:
+        return
+
+    if _executor is None and WHISPER_WORKERS > 0:
+        _executor = ProcessPoolExecutor(
+            max_workers=WHISPER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    _loop = loop
+    _queue = asyncio.Queue(maxsize=WHISPER_QUEUE_SIZE)
+    _dispatchers = [loop.create_task(_dispatch(_queue)) for _ in range(max(WHISPER_WORKERS, 1))]
+
+def _run_batch(items: List[bytes]) -> Tuple[int, Optional[float], List[Any]]:
+    # Runs in the worker; the model loads there, so its load time travels back with the results
+    return os.getpid(), _load_times.get(WHISPER_MODEL), transcribe_batch(items)
+
+def _record_load_time(pid: int, load_time: Optional[float]):
+    if load_time is not None:
+        _worker_load_times[pid] = load_time
+
+async def _dispatch(queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        jobs = [await queue.get()]
+        while len(jobs) < max(WHISPER_BATCH_SIZE, 1) and not queue.empty():
+            jobs.append(queue.get_nowait())
+        pending = [(audio_bytes, future) for audio_bytes, future in jobs if not future.cancelled()]
+        try:
+            if not pending:
+                continue
+            pid, load_time, results = await loop.run_in_executor(_executor, _run_batch, [audio_bytes for audio_bytes, _ in pending])
+            _record_load_time(pid, load_time)
+            for (_, future), result in zip(pending, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for _ in jobs:
+                queue.task_done()
+
+async def transcribe(audio_bytes: bytes) -> Tuple[str, str]:
+    """
+    Queue uploaded audio for transcription on the worker pool and wait for
+    (text, detected_language). Raises TranscriptionQueueFull when the queue
+    is at capacity.
+    """
+    _ensure_started()
+    future = asyncio.get_running_loop().create_future()
+    try:
+        _queue.put_nowait((audio_bytes, future))
+    except asyncio.QueueFull:
+        raise TranscriptionQueueFull(f"Transcription queue is full ({WHISPER_QUEUE_SIZE} pending requests)")
+    return await future
+
+async def warmup():
+    """Start the worker pool and load the model in each worker ahead of the first request"""
+    _ensure_started()
+    loop = asyncio.get_running_loop()
+    loaded = await asyncio.gather(*(loop.run_in_executor(_executor, warmup_model) for _ in range(max(WHISPER_WORKERS, 1))))
+    for pid, load_time in loaded:
+        _record_load_time(pid, load_time)
+
+def shutdown():
+    global _executor, _queue, _dispatchers, _loop
+    for task in _dispatchers:
+        task.cancel()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor, _queue, _dispatchers, _loop = None, None, [], None
+    _worker_load_times.clear()
+
+def stats() -> Dict[str, Any]:
+    # With worker processes the model lives (and is timed) there; report the slowest load seen
+    load_times = list(_worker_load_times.values())
+    if WHISPER_MODEL in _load_times:
+        load_times.append(_load_times[WHISPER_MODEL])
+    return {
+        "model": WHISPER_MODEL,
+        "loaded": WHISPER_MODEL in _models or bool(_worker_load_times),
+        "load_time_seconds": max(load_times) if load_times else None,
+        "workers_loaded": len(_worker_load_times),
+        "workers": WHISPER_WORKERS,
+        "batch_size": WHISPER_BATCH_SIZE,
+        "language": WHISPER_LANGUAGE,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "queue_size": WHISPER_QUEUE_SIZE
+    }
@@ -1,7 +1,7 @@
 import pytest
 import os
 import sys
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Add the project root to path to ensure imports work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -24,10 +24,10 @@ def mock_db():
     mock_cursor = MagicMock()
     mock_conn.cursor.return_value = mock_cursor
     
-    # Configure fetchall for general query results
+    # Configure fetchall for general query results (tuples, like the default psycopg2 cursor)
     mock_cursor.fetchall.return_value = [
-        {"id": 1, "name": "John Doe", "dept_id": 1, "department_name": "AAP"},
-        {"id": 2, "name": "Jane Smith", "dept_id": 2, "department_name": "CBD"}
+        (1, "John Doe", 1, "AAP"),
+        (2, "Jane Smith", 2, "CBD")
     ]
     
     # Configure fetchone for single row queries
@@ -97,7 +97,7 @@ def mock_llm_chain():
 @pytest.fixture
 def mock_sql_generation():
     """Mock for SQL generation from natural language"""
-    with patch('routers.nl_query.process_natural_language_query') as mock_fn:
+    with patch('routers.nl_query.process_natural_language_query', new_callable=AsyncMock) as mock_fn:
         mock_fn.return_value = """
         SELECT e.id, e.name, d.name as department_name 
         FROM "employees" e 
@@ -122,6 +122,13 @@ def mock_weather_forecast():
         }
         yield mock_fn
 
+@pytest.fixture
+def mock_weather_db(mock_db):
+    """mock_db as the pooled connection the weather assistant borrows for inventories"""
+    with patch('routers.weather_assistant.connection') as mock_connection:
+        mock_connection.return_value.__enter__.return_value = mock_db
+        yield mock_db
+
 # Mock the responses library for HTTP request mocking
 @pytest.fixture
 def mock_http_responses():
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+def forecast_entry(when: datetime, temp: float, conditions: str = "Clouds", wind: float = 3.0, rain: float = 0.0):
+    """Build one 3-hour entry in the OpenWeatherMap forecast format"""
+    entry = {
+        "dt": int(when.timestamp()),
+        "main": {"temp": temp, "feels_like": temp - 1, "humidity": 70},
+        "weather": [{"main": conditions, "description": conditions.lower()}],
+        "wind": {"speed": wind}
+    }
+    if rain:
+        entry["rain"] = {"3h": rain}
+    return entry
+
+def forecast_response(start: datetime, temps, conditions: str = "Clouds", wind: float = 3.0, rain: float = 0.0):
+    """Build a forecast response with one entry every 3 hours starting at `start`"""
+    return {
+        "list": [
+            forecast_entry(start + timedelta(hours=3 * i), temp, conditions, wind, rain)
+            for i, temp in enumerate(temps)
+        ]
+    }
@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from services import forecast_cache, sql_cache
+from services.cache import SingleFlight, TTLCache
+from services.semantic_cache import VectorIndex, literals_match
+
+@pytest.mark.unit
+class TestTTLCache:
+    """Unit tests for the shared TTL/LRU cache"""
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        with patch("services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("services.cache.time.monotonic", return_value=109.0):
+            assert cache.get("a") == 1
+        with patch("services.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Unit tests for concurrent call de-duplication"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "forecast"
+
+        async def run():
+            flight = SingleFlight()
+            return await asyncio.gather(*(flight.do("london", fetch) for _ in range(5)))
+
+        assert asyncio.run(run()) == ["forecast"] * 5
+        assert len(calls) == 1
+
+    def test_errors_propagate_to_all_callers(self):
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def run():
+            flight = SingleFlight()
+            return await asyncio.gather(*(flight.do("london", fetch) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.unit
+class TestForecastCache:
+    """Unit tests for forecast cache keys and lookups"""
+
+    def test_normalize_location(self):
+        assert forecast_cache.normalize_location("  London ,  UK ") == "london,uk"
+        assert forecast_cache.normalize_location("New   York, US") == "new york,us"
+
+    def test_cache_key_changes_with_three_hour_slot(self):
+        slot = forecast_cache.FORECAST_SLOT_SECONDS
+        assert forecast_cache.cache_key("London, UK", now=slot * 10) == forecast_cache.cache_key("london,uk", now=slot * 10 + 60)
+        assert forecast_cache.cache_key("London, UK", now=slot * 10) != forecast_cache.cache_key("London, UK", now=slot * 11)
+        assert forecast_cache.seconds_until_next_slot(now=slot * 10 + 60) == slot - 60
+
+    def test_get_or_fetch_calls_upstream_once(self):
+        forecast_cache.clear()
+        fetched = []
+
+        async def fetch(location):
+            fetched.append(location)
+            return {"list": []}
+
+        async def run():
+            await forecast_cache.get_or_fetch("London, UK", fetch)
+            return await forecast_cache.get_or_fetch("london,uk", fetch)
+
+        assert asyncio.run(run()).days == {}
+        assert fetched == ["london,uk"]
+
+@pytest.mark.unit
+class TestSQLCache:
+    """Unit tests for the NL-to-SQL translation cache"""
+
+    def setup_method(self):
+        sql_cache.clear()
+
+    def test_key_ignores_case_spacing_and_punctuation(self):
+        assert sql_cache.cache_key("Show all employees in AAP?", "v1") == sql_cache.cache_key("  show  ALL employees in aap ", "v1")
+        assert sql_cache.cache_key("show all employees", "v1") != sql_cache.cache_key("show all employees", "v2")
+
+    def test_persists_across_restarts(self, tmp_path):
+        path = str(tmp_path / "nl_sql_cache.json")
+        sql_cache.put("v1:show all employees", 'SELECT * FROM "employees";')
+        sql_cache.save(path)
+        sql_cache.clear()
+
+        assert sql_cache.load(path) == 1
+        assert sql_cache.get("v1:show all employees") == 'SELECT * FROM "employees";'
+
+    def test_missing_file_loads_nothing(self, tmp_path):
+        assert sql_cache.load(str(tmp_path / "missing.json")) == 0
+
+@pytest.mark.unit
+class TestVectorIndex:
+    """Unit tests for the in-process semantic cache index"""
+
+    def test_returns_closest_entry(self):
+        pytest.importorskip("numpy")
+        index = VectorIndex(maxsize=4)
+        index.add([1.0, 0.0], "a")
+        index.add([0.0, 1.0], "b")
+
+        score, value = index.search([0.9, 0.1])
+        assert value == "a"
+        assert score > 0.9
+
+    def test_overwrites_oldest_when_full(self):
+        pytest.importorskip("numpy")
+        index = VectorIndex(maxsize=2)
+        index.add([1.0, 0.0], "a")
+        index.add([0.0, 1.0], "b")
+        index.add([1.0, 1.0], "c")
+
+        assert len(index) == 2
+        assert index.search([1.0, 0.0])[1] == "c"
+
+    def test_literal_guard(self):
+        sql = "SELECT name FROM \"employees\" WHERE dept_id = 3 AND name = 'O''Brien';"
+
+        assert literals_match(sql, "Is O'Brien in department 3?")
+        assert not literals_match(sql, "Is O'Brien in department 4?")
+
+    @pytest.mark.parametrize("sql,query", [
+        ('SELECT * FROM "employees" WHERE salary > 5000;', "employees earning more than 50000"),
+        ('SELECT * FROM "employees" WHERE dept_id = 3;', "employees in department 13"),
+        ("SELECT * FROM \"departments\" WHERE name = 'AA';", "employees in AAP"),
+    ])
+    def test_literal_guard_matches_whole_tokens(self, sql, query):
+        assert not literals_match(sql, query)
+
+    def test_literal_guard_allows_punctuation_around_tokens(self):
+        assert literals_match('SELECT * FROM "employees" WHERE salary > 5000;', "Who earns over 5000?")
@@ -0,0 +1,135 @@
+import pytest
+from unittest.mock import patch
+
+import psycopg2
+import psycopg2.extensions
+
+import db
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.queries.append(sql)
+        if not self.conn.healthy:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.healthy = True
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.queries = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+class FakeThreadedConnectionPool:
+    """Stands in for psycopg2's ThreadedConnectionPool: reuses returned connections, opens new ones otherwise"""
+
+    def __init__(self, minconn, maxconn, **params):
+        self.idle = []
+        self.discarded = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+            self.discarded.append(conn)
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        self.idle.clear()
+
+@pytest.fixture
+def conn_pool():
+    with patch.object(db.pool, "ThreadedConnectionPool", FakeThreadedConnectionPool):
+        yield db.ConnectionPool(1, 1)
+
+def at(seconds):
+    return patch("db.time.monotonic", return_value=seconds)
+
+@pytest.mark.unit
+class TestConnectionPool:
+    """Unit tests for checkout limits, health checks and recycling in the pool wrapper"""
+
+    def test_checkout_times_out_when_exhausted(self, conn_pool):
+        conn = conn_pool.getconn()
+
+        with pytest.raises(db.pool.PoolError, match="pool exhausted"):
+            conn_pool.getconn(timeout=0.01)
+
+        conn_pool.putconn(conn)
+        assert conn_pool.getconn(timeout=0.01) is conn
+
+    def test_recently_used_connection_is_reused_without_a_check(self, conn_pool):
+        with at(100.0):
+            conn = conn_pool.getconn()
+            conn_pool.putconn(conn)
+        with at(100.0 + db.DB_POOL_HEALTH_CHECK_SECONDS - 1):
+            assert conn_pool.getconn() is conn
+
+        assert conn.queries == []
+
+    def test_failed_health_check_replaces_the_connection(self, conn_pool):
+        with at(100.0):
+            conn = conn_pool.getconn()
+            conn_pool.putconn(conn)
+        conn.healthy = False
+        with at(100.0 + db.DB_POOL_HEALTH_CHECK_SECONDS + 1):
+            replacement = conn_pool.getconn()
+
+        assert replacement is not conn
+        assert conn.queries == ["SELECT 1"]
+        assert conn_pool._pool.discarded == [conn]
+
+    def test_idle_connection_is_recycled(self, conn_pool):
+        with at(100.0):
+            conn = conn_pool.getconn()
+            conn_pool.putconn(conn)
+        with at(100.0 + db.DB_POOL_MAX_IDLE_SECONDS + 1):
+            replacement = conn_pool.getconn()
+
+        assert replacement is not conn
+        assert conn.queries == []
+        assert conn_pool._pool.discarded == [conn]
+
+    def test_old_connection_is_recycled(self, conn_pool):
+        with at(100.0):
+            conn = conn_pool.getconn()
+        with at(100.0 + db.DB_POOL_MAX_LIFETIME_SECONDS - 10):
+            conn_pool.putconn(conn)
+        with at(100.0 + db.DB_POOL_MAX_LIFETIME_SECONDS + 1):
+            replacement = conn_pool.getconn()
+
+        assert replacement is not conn
+        assert conn_pool._pool.discarded == [conn]
+
+    def test_putconn_rolls_back_open_transactions(self, conn_pool):
+        conn = conn_pool.getconn()
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        conn_pool.putconn(conn)
+
+        assert conn.rollbacks == 1
+        assert conn_pool._pool.idle == [conn]
+
+        conn_pool.putconn(conn_pool.getconn())
+        assert conn.rollbacks == 1
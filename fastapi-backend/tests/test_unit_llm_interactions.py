@@ -0,0 +1,356 @@
+import asyncio
+import pytest
+from datetime import date
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from routers import nl_query
+from services import llm, schema_registry, sql_templates
+
+SCHEMA = schema_registry.SchemaSnapshot.from_rows(
+    columns=[
+        ("employees", "id", "integer", "NO"),
+        ("employees", "name", "character varying", "NO"),
+        ("employees", "dept_id", "integer", "YES"),
+        ("departments", "id", "integer", "NO"),
+        ("departments", "name", "character varying", "YES"),
+    ],
+    constraints=[
+        ("employees", "id", "PRIMARY KEY", None, None),
+        ("employees", "dept_id", "FOREIGN KEY", "departments", "id"),
+        ("departments", "id", "PRIMARY KEY", None, None),
+    ]
+)
+
+@pytest.fixture(autouse=True)
+def schema():
+    with patch.object(schema_registry, "get", return_value=SCHEMA):
+        yield SCHEMA
+
+@pytest.mark.unit
+@pytest.mark.llm
+class TestNLQueryLLMFunctions:
+    """Unit tests for the LLM-backed helpers in the NL query router"""
+
+    def test_clean_sql_query(self):
+        response = "Here you go:\n```sql\nSELECT name FROM employees\n```"
+        assert nl_query.clean_sql_query(response) == 'SELECT name FROM "employees";'
+
+    def test_process_natural_language_query(self):
+        with patch.object(nl_query.llm, "complete", AsyncMock(return_value="```sql\nSELECT * FROM employees;\n```")) as complete:
+            result = asyncio.run(nl_query.process_natural_language_query("Show all employees"))
+
+        assert result == 'SELECT * FROM "employees";'
+        prompt = complete.await_args.args[0]
+        assert "Show all employees" in prompt
+        assert "employees" in prompt
+
+    def test_generate_user_friendly_message_falls_back_on_error(self):
+        with patch.object(nl_query.llm, "complete", AsyncMock(side_effect=RuntimeError("timeout"))):
+            message = asyncio.run(nl_query.generate_user_friendly_message("Show all employees", [{"id": 1}]))
+
+        assert message == "Here are the results: [{'id': 1}]"
+
+    def test_repeat_questions_skip_the_llm(self):
+        nl_query.sql_cache.clear()
+        with patch.object(nl_query.semantic_cache, "NL_SEMANTIC_CACHE_ENABLED", False), \
+                patch.object(nl_query.llm, "complete", AsyncMock(return_value="```sql\nSELECT * FROM employees;\n```")) as complete, \
+                patch.object(nl_query, "execute_safe_sql", return_value=[{"id": 1}]) as execute:
+            first = asyncio.run(nl_query.translate_and_execute("Show all employees"))
+            second = asyncio.run(nl_query.translate_and_execute("  show all EMPLOYEES? "))
+
+        assert first == ('SELECT * FROM "employees";', [{"id": 1}], "llm")
+        assert second == ('SELECT * FROM "employees";', [{"id": 1}], "cache")
+        complete.assert_awaited_once()
+        assert execute.call_count == 2
+
+    def test_rejected_sql_is_not_cached(self):
+        nl_query.sql_cache.clear()
+        with patch.object(nl_query.semantic_cache, "NL_SEMANTIC_CACHE_ENABLED", False), \
+                patch.object(nl_query.llm, "complete", AsyncMock(return_value="DELETE FROM employees")), \
+                patch.object(nl_query, "execute_safe_sql", side_effect=ValueError("Only SELECT queries are allowed")):
+            with pytest.raises(ValueError):
+                asyncio.run(nl_query.translate_and_execute("Remove everyone"))
+
+        assert nl_query.sql_cache.stats()["size"] == 0
+
+    def test_paraphrases_reuse_cached_sql(self):
+        nl_query.sql_cache.clear()
+        nl_query.semantic_cache.clear()
+        embeddings = {"staff list for AAP": [1.0, 0.0], "people working at AAP": [0.99, 0.05], "people working at CBD": [0.99, 0.06]}
+        sql = "```sql\nSELECT name FROM employees e JOIN departments d ON e.dept_id = d.id WHERE d.name = 'AAP'\n```"
+        with patch.object(nl_query.llm, "embed", AsyncMock(side_effect=embeddings.get)), \
+                patch.object(nl_query.llm, "complete", AsyncMock(return_value=sql)) as complete, \
+                patch.object(nl_query, "execute_safe_sql", return_value=[{"name": "John Doe"}]):
+            asyncio.run(nl_query.translate_and_execute("staff list for AAP"))
+            _, _, paraphrase_source = asyncio.run(nl_query.translate_and_execute("people working at AAP"))
+            _, _, other_department_source = asyncio.run(nl_query.translate_and_execute("people working at CBD"))
+
+        assert paraphrase_source == "semantic_cache"
+        assert other_department_source == "llm"
+        assert complete.await_count == 2
+
+@pytest.mark.unit
+@pytest.mark.llm
+class TestNLQueryMessages:
+    """Unit tests for how the NL query pipeline builds its user message"""
+
+    def test_template_messages_for_simple_shapes(self):
+        assert nl_query.template_message("Who is in AAP?", []) == 'No results found for "Who is in AAP?".'
+        assert nl_query.template_message("How many employees?", [{"employee_count": 42}]) == "The employee count is 42."
+        assert nl_query.template_message("Names", [{"name": "John"}, {"name": "Jane"}]) == "Found 2 results (name): John, Jane."
+        assert nl_query.template_message("Everything", [{"id": 1, "name": "John"}]) is None
+
+    def test_auto_mode_skips_the_llm_for_simple_results(self):
+        with patch.object(nl_query.llm, "complete", AsyncMock(return_value="Summary")) as complete:
+            message, metadata = asyncio.run(nl_query.build_user_message("How many employees?", [{"count": 3}], "auto"))
+
+        assert message == "The count is 3."
+        assert metadata == {"message_source": "template"}
+        complete.assert_not_awaited()
+
+    def test_deferred_mode_returns_a_message_id(self):
+        async def run():
+            message, metadata = await nl_query.build_user_message("Everything", [{"id": 1, "name": "John"}], "deferred")
+            return message, metadata, await nl_query.get_deferred_message(metadata["message_id"])
+
+        with patch.object(nl_query.llm, "complete", AsyncMock(return_value=" Summary ")):
+            message, metadata, deferred = asyncio.run(run())
+
+        assert message is None
+        assert metadata["message_source"] == "deferred"
+        assert deferred["user_message"] == "Summary"
+
+    def test_friendly_message_prompt_is_bounded(self):
+        small = [{"id": i, "name": f"Employee {i}"} for i in range(10)]
+        large = [{"id": i, "name": f"Employee {i}"} for i in range(10000)]
+
+        with patch.object(nl_query.llm, "complete", AsyncMock(return_value="Summary")) as complete:
+            asyncio.run(nl_query.generate_user_friendly_message("Everyone", small))
+            small_prompt = complete.await_args.args[0]
+            asyncio.run(nl_query.generate_user_friendly_message("Everyone", large))
+            large_prompt = complete.await_args.args[0]
+
+        assert '"row_count": 10000' in large_prompt
+        assert "Employee 9999" not in large_prompt
+        assert len(large_prompt) < len(small_prompt) + 200
+
+    def test_keyword_intents_skip_the_llm(self):
+        from routers import open_ai_helper
+
+        with patch.object(open_ai_helper.llm, "complete", AsyncMock(return_value="Viewing")) as complete:
+            intent = asyncio.run(open_ai_helper.determine_intent("Show me Artem's schedule"))
+
+        assert intent == "querying employee data"
+        complete.assert_not_awaited()
+
+@pytest.mark.unit
+class TestSQLTemplates:
+    """Unit tests for the prepared SQL templates for common intents"""
+
+    @pytest.mark.parametrize("query,template,params", [
+        ("show all employees in aap", "employees_by_department", ("aap",)),
+        ("who works in the cbd department", "employees_by_department", ("cbd",)),
+        ("reservations from 2024-01-01 to 2024-02-01", "reservations_in_date_range", (date(2024, 1, 1), date(2024, 2, 1))),
+        ("artem's appointments", "appointments_for_person", ("artem",)),
+    ])
+    def test_matches_common_intents(self, query, template, params):
+        found = sql_templates.match(query)
+
+        assert found.template.name == template
+        assert found.params == params
+
+    def _lookup_conn(self):
+        # Lowercased names as the lookup queries return them
+        known = {
+            "departments": [("aap",), ("cbd",)],
+            "employees": [("artem kushnir",), ("artem",), ("kushnir",), ("nick",)],
+        }
+        cursor = MagicMock()
+        cursor.execute.side_effect = lambda sql: setattr(
+            cursor, "rows", known["departments"] if '"departments"' in sql else known["employees"])
+        cursor.fetchall.side_effect = lambda: cursor.rows
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return conn
+
+    def setup_method(self):
+        sql_templates.clear_lookups()
+
+    @pytest.mark.parametrize("query", [
+        "show all employees",
+        "list employees",
+        "show employees",
+        "show me employees",
+        "show active employees",
+        "list new employees",
+        "employees in london",
+        "employees in 2024",
+        "appointments for all employees",
+        "appointments for today",
+        "appointments for next week",
+        "how many employees are in aap",
+        "reservations from 2024-02-01 to 2024-01-01",
+    ])
+    def test_leaves_other_questions_to_the_llm(self, query):
+        found = sql_templates.match(query)
+
+        assert found is None or not sql_templates.accepts(self._lookup_conn(), found)
+
+    @pytest.mark.parametrize("query", [
+        "show all employees in aap",
+        "list cbd employees",
+        "appointments for artem",
+        "appointments for artem kushnir",
+        "reservations from 2024-01-01 to 2024-02-01",
+    ])
+    def test_accepts_known_departments_and_people(self, query):
+        assert sql_templates.accepts(self._lookup_conn(), sql_templates.match(query))
+
+    def test_lookups_are_cached(self):
+        conn = self._lookup_conn()
+        sql_templates.accepts(conn, sql_templates.match("aap employees"))
+        sql_templates.accepts(conn, sql_templates.match("cbd employees"))
+
+        assert conn.cursor.return_value.__enter__.return_value.execute.call_count == 1
+
+    def test_date_range_includes_work_reservations(self):
+        found = sql_templates.match("reservations from 2024-01-01 to 2024-01-31")
+
+        assert "COALESCE(r.start_date, r.work_date) <= $2" in found.template.sql
+        assert "COALESCE(r.end_date, r.work_date) >= $1" in found.template.sql
+
+    def test_statement_is_prepared_once_per_connection(self):
+        import psycopg2.errors
+
+        cursor = MagicMock()
+        cursor.execute.side_effect = [psycopg2.errors.InvalidSqlStatementName(), None, None, None]
+        cursor.fetchall.return_value = [{"name": "Nick"}]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+
+        found = sql_templates.match("show all employees in aap")
+        assert sql_templates.execute(conn, found) == [{"name": "Nick"}]
+        assert sql_templates.execute(conn, found) == [{"name": "Nick"}]
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert [statement.split()[0] for statement in statements] == ["EXECUTE", "PREPARE", "EXECUTE", "EXECUTE"]
+
+    def test_template_answers_skip_the_llm(self):
+        with patch.object(nl_query, "connection"), \
+                patch.object(nl_query.sql_templates, "accepts", return_value=True), \
+                patch.object(nl_query.sql_templates, "execute", return_value=[{"name": "Nick"}]), \
+                patch.object(nl_query.llm, "complete", AsyncMock()) as complete:
+            _, results, source = asyncio.run(nl_query.translate_and_execute("Show all employees in AAP"))
+
+        assert results == [{"name": "Nick"}]
+        assert source == "template"
+        complete.assert_not_awaited()
+
+    def test_unknown_names_fall_through_to_translation(self):
+        with patch.object(nl_query, "connection"), \
+                patch.object(nl_query.sql_templates, "accepts", return_value=False), \
+                patch.object(nl_query, "translate_query", AsyncMock(return_value=('SELECT 1;', "llm", None))), \
+                patch.object(nl_query, "execute_safe_sql", return_value=[{"count": 3}]), \
+                patch.object(nl_query, "remember_translation"):
+            _, results, source = asyncio.run(nl_query.translate_and_execute("Show active employees"))
+
+        assert results == [{"count": 3}]
+        assert source == "llm"
+
+@pytest.mark.unit
+class TestNLQueryStreaming:
+    """Unit tests for NDJSON result streaming"""
+
+    def _lines(self, rows, max_rows):
+        import json
+
+        with patch.object(nl_query, "stream_query", return_value=iter(rows)) as stream_query, \
+                patch.object(nl_query, "remember_translation") as remember:
+            lines = [json.loads(line) for line in nl_query.result_lines("Everything", 'SELECT * FROM "employees";', "llm", None, max_rows)]
+        return lines, stream_query, remember
+
+    def test_streams_rows_between_header_and_metadata(self):
+        lines, stream_query, remember = self._lines([{"id": 1}, {"id": 2}], max_rows=5)
+
+        assert lines[0] == {"original_query": "Everything", "sql_query": 'SELECT * FROM "employees";'}
+        assert lines[1:3] == [{"row": {"id": 1}}, {"row": {"id": 2}}]
+        assert lines[3]["metadata"]["row_count"] == 2
+        assert lines[3]["metadata"]["truncated"] is False
+        stream_query.assert_called_once_with('SELECT * FROM "employees";', 6)
+        remember.assert_called_once()
+
+    def test_row_cap_sets_truncated(self):
+        lines, _, _ = self._lines([{"id": 1}, {"id": 2}, {"id": 3}], max_rows=2)
+
+        assert [line["row"]["id"] for line in lines if "row" in line] == [1, 2]
+        assert lines[-1]["metadata"]["truncated"] is True
+
+    def test_stream_query_guards_and_runs_the_capped_query(self):
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value.__iter__.return_value = iter([{"id": 1}])
+
+        with patch.object(nl_query, "connection") as connection, \
+                patch.object(nl_query.sql_guard, "guard") as guard:
+            connection.return_value.__enter__.return_value = conn
+            rows = list(nl_query.stream_query('SELECT * FROM "employees";', 6))
+
+        capped = 'SELECT * FROM "employees"\nLIMIT 6'
+        assert rows == [{"id": 1}]
+        assert guard.call_args.args[1] == capped
+        conn.cursor.return_value.__enter__.return_value.execute.assert_called_once_with(capped)
+
+@pytest.mark.unit
+@pytest.mark.llm
+class TestLLMClient:
+    """Unit tests for the shared async LLM client layer"""
+
+    def test_chat_returns_message_text(self):
+        response = MagicMock()
+        response.choices[0].message.content = "Hello"
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=response)
+
+        with patch.object(llm, "get_client", return_value=client):
+            assert asyncio.run(llm.chat([{"role": "user", "content": "Hi"}])) == "Hello"
+
+        assert client.chat.completions.create.await_args.kwargs["timeout"] == llm.LLM_TIMEOUT_SECONDS
+
+    def test_chat_deadline_covers_retries(self):
+        async def create(**kwargs):
+            await asyncio.sleep(1)
+
+        client = MagicMock()
+        client.with_options.return_value.chat.completions.create = create
+
+        with patch.object(llm, "get_client", return_value=client), \
+                patch.object(llm, "_semaphore", None):
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(llm.chat([{"role": "user", "content": "Hi"}], max_retries=0, deadline=0.01))
+
+        client.with_options.assert_called_once_with(max_retries=0)
+
+    def test_concurrency_is_bounded(self):
+        in_flight = []
+        peak = []
+
+        async def create(**kwargs):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            response = MagicMock()
+            response.choices[0].text = "ok"
+            return response
+
+        client = MagicMock()
+        client.completions.create = create
+
+        async def run():
+            return await asyncio.gather(*(llm.complete("prompt") for _ in range(5)))
+
+        with patch.object(llm, "get_client", return_value=client), \
+                patch.object(llm, "_semaphore", None), \
+                patch.object(llm, "LLM_MAX_CONCURRENCY", 2):
+            assert asyncio.run(run()) == ["ok"] * 5
+
+        assert max(peak) == 2
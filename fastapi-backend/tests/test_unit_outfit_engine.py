@@ -0,0 +1,56 @@
+import pytest
+
+from routers.weather_assistant import get_user_clothes
+from services import outfit_engine
+from unittest.mock import MagicMock
+
+@pytest.fixture
+def inventory():
+    db = MagicMock()
+    db.cursor.return_value.fetchall.return_value = [(1, "Nick")]
+    return get_user_clothes(db, 1)
+
+def weather(temperature, conditions="Clouds", wind_speed=2.0, **extra):
+    return dict(temperature=temperature, feels_like=temperature, conditions=conditions, description=conditions.lower(), wind_speed=wind_speed, **extra)
+
+@pytest.mark.unit
+class TestOutfitEngine:
+    """Unit tests for the rule-based outfit engine"""
+
+    def test_target_warmth_bands(self):
+        assert outfit_engine.target_warmth(28) == outfit_engine.WARMTH_LEVELS["light"]
+        assert outfit_engine.target_warmth(18) == outfit_engine.WARMTH_LEVELS["medium"]
+        assert outfit_engine.target_warmth(10) == outfit_engine.WARMTH_LEVELS["warm"]
+        assert outfit_engine.target_warmth(-3) == outfit_engine.WARMTH_LEVELS["heavy"]
+
+    def test_hot_sunny_day(self, inventory):
+        result = outfit_engine.recommend_outfit(weather(28, "Clear"), inventory)
+
+        assert result["outfit"]["top"] == [1, "White t-shirt"]
+        assert result["outfit"]["bottom"] == [2, "Khaki shorts"]
+        assert result["outfit"]["footwear"] == [3, "Brown sandals"]
+        assert [item[0] for item in result["outfit"]["accessories"]] == [4]
+        assert set(result) == {"summary", "outfit", "tips", "source"}
+
+    def test_cold_rainy_day(self, inventory):
+        result = outfit_engine.recommend_outfit(weather(2, "Rain"), inventory)
+
+        assert result["outfit"]["top"] == [5, "Brown coat"]
+        assert result["outfit"]["footwear"] == [2, "Brown boots"]
+        accessories = {item[1] for item in result["outfit"]["accessories"]}
+        assert accessories == {"Black hat", "Red scarf", "Black gloves", "Blue umbrella"}
+
+    def test_wind_lowers_effective_temperature(self, inventory):
+        calm = outfit_engine.recommend_outfit(weather(16), inventory)
+        windy = outfit_engine.recommend_outfit(weather(16, wind_speed=12), inventory)
+
+        assert calm["outfit"]["top"] == [3, "Black hoodie"]
+        assert windy["outfit"]["top"] == [2, "Gray sweater"]
+        assert any("windy" in tip for tip in windy["tips"])
+
+    def test_candidate_items_shrinks_inventory(self, inventory):
+        candidates = outfit_engine.candidate_items(weather(2, "Rain"), inventory, per_category=2)
+
+        assert len(candidates["tops"]) == 2
+        assert candidates["tops"][0]["type"] == "coat"
+        assert {item["type"] for item in candidates["accessories"]} == {"hat", "scarf", "gloves", "umbrella"}
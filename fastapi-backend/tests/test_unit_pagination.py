@@ -0,0 +1,85 @@
+import pytest
+from datetime import date
+from unittest.mock import MagicMock
+
+from services import pagination
+
+@pytest.mark.unit
+class TestFetchPage:
+    """Unit tests for keyset page fetching"""
+
+    def _db(self, rows):
+        db = MagicMock()
+        db.cursor.return_value.fetchall.return_value = rows
+        return db
+
+    def test_first_page_without_filters(self):
+        db = self._db([(1, "AAP"), (2, "CBD")])
+
+        rows, next_cursor = pagination.fetch_page(db, "departments", limit=5)
+
+        db.cursor.return_value.execute.assert_called_once_with(
+            "SELECT * FROM departments ORDER BY id LIMIT %s", (6,)
+        )
+        assert rows == [(1, "AAP"), (2, "CBD")]
+        assert next_cursor is None
+
+    def test_extra_row_yields_next_cursor(self):
+        db = self._db([(3, "Nick"), (7, "Artem"), (9, "Dewar")])
+
+        rows, next_cursor = pagination.fetch_page(db, "employees", after=2, limit=2)
+
+        assert rows == [(3, "Nick"), (7, "Artem")]
+        assert next_cursor == 7
+
+    def test_filters_and_cursor_are_parameterized(self):
+        db = self._db([])
+
+        pagination.fetch_page(db, "employees", [("dept_id = %s", 4)], after=10, limit=20)
+
+        db.cursor.return_value.execute.assert_called_once_with(
+            "SELECT * FROM employees WHERE dept_id = %s AND id > %s ORDER BY id LIMIT %s", (4, 10, 21)
+        )
+
+@pytest.mark.unit
+class TestListEndpoints:
+    """Unit tests for the paginated list endpoints"""
+
+    def test_employees_page_and_filter(self, client, mock_db):
+        mock_db.cursor.return_value.fetchall.return_value = [(1, "Nick", 12000, 2, 1), (2, "Artem", 12000, 2, 2)]
+
+        response = client.get("/employees/", params={"limit": 1, "dept_id": 2})
+
+        assert response.json() == {"employees": [[1, "Nick", 12000, 2, 1]], "next_cursor": 1}
+        sql, params = mock_db.cursor.return_value.execute.call_args.args
+        assert "dept_id = %s" in sql
+        assert params == (2, 2)
+
+    def test_reservations_date_range_overlap(self, client, mock_db):
+        mock_db.cursor.return_value.fetchall.return_value = []
+
+        response = client.get("/reservations/", params={
+            "employee_id": 5, "date_from": "2024-06-01", "date_to": "2024-06-30", "after": 40,
+        })
+
+        assert response.json() == {"reservations": [], "next_cursor": None}
+        sql, params = mock_db.cursor.return_value.execute.call_args.args
+        assert "employee_id = %s AND COALESCE(end_date, work_date) >= %s AND COALESCE(start_date, work_date) <= %s AND id > %s" in sql
+        assert params == (5, date(2024, 6, 1), date(2024, 6, 30), 40, pagination.PAGE_DEFAULT_LIMIT + 1)
+
+    def test_reservations_date_range_includes_work_reservations(self, client, mock_db):
+        # Work reservations have NULL start/end dates and their day in work_date
+        work_reservation = (4, 1, None, None, 3, "08:00:00", "17:00:00", "2024-01-05")
+        mock_db.cursor.return_value.fetchall.return_value = [work_reservation]
+
+        response = client.get("/reservations/", params={"date_from": "2024-01-05", "date_to": "2024-01-05"})
+
+        assert response.json()["reservations"] == [list(work_reservation)]
+        sql, params = mock_db.cursor.return_value.execute.call_args.args
+        assert "COALESCE(end_date, work_date) >= %s" in sql
+        assert "COALESCE(start_date, work_date) <= %s" in sql
+
+    def test_limit_is_bounded(self, client, mock_db):
+        response = client.get("/departments/", params={"limit": pagination.PAGE_MAX_LIMIT + 1})
+
+        assert response.status_code == 422
@@ -0,0 +1,146 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from services import schema_registry
+
+COLUMNS = [
+    ("employees", "id", "integer", "NO"),
+    ("employees", "name", "character varying", "NO"),
+    ("employees", "salary", "integer", "YES"),
+    ("employees", "dept_id", "integer", "YES"),
+    ("departments", "id", "integer", "NO"),
+    ("departments", "name", "character varying", "YES"),
+    ("appointments", "appointment_id", "integer", "NO"),
+    ("appointments", "employee_id", "integer", "YES"),
+    ("appointments", "start_time", "timestamp without time zone", "YES"),
+    ("alembic_version", "version_num", "character varying", "NO"),
+]
+
+CONSTRAINTS = [
+    ("employees", "id", "PRIMARY KEY", None, None),
+    ("employees", "dept_id", "FOREIGN KEY", "departments", "id"),
+    ("departments", "id", "PRIMARY KEY", None, None),
+    ("appointments", "appointment_id", "PRIMARY KEY", None, None),
+    ("appointments", "employee_id", "FOREIGN KEY", "employees", "id"),
+]
+
+CHECKS = [
+    ("employees", "salary", "CHECK ((salary >= 0))"),
+]
+
+COMMENTS = [
+    ("appointments", "start_time", "local time"),
+]
+
+@pytest.mark.unit
+class TestSchemaSnapshot:
+    """Unit tests for the introspected schema rendering"""
+
+    def test_compact_rendering(self):
+        schema = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+
+        assert schema.render(["employees", "appointments"]) == (
+            "PostgreSQL tables:\n"
+            "employees(id int PK, name varchar, salary int, dept_id int FK departments.id)\n"
+            "appointments(appointment_id int PK, employee_id int FK employees.id, start_time timestamp)"
+        )
+        assert "alembic_version" not in schema.tables
+
+    def test_renders_checks_and_comments(self):
+        columns = [("reservations", "reservation_type", "integer", "YES")]
+        checks = [("reservations", "reservation_type", "CHECK ((reservation_type = ANY (ARRAY[1, 2, 3])))")]
+        comments = [("reservations", "reservation_type", "1: vacation, 2: sick leave, 3: work")]
+        schema = schema_registry.SchemaSnapshot.from_rows(columns, [], checks=checks, comments=comments)
+
+        assert schema.render() == (
+            "PostgreSQL tables:\n"
+            "reservations(reservation_type int CHECK ((reservation_type = ANY (ARRAY[1, 2, 3]))) /* 1: vacation, 2: sick leave, 3: work */)"
+        )
+        assert schema.version != schema_registry.SchemaSnapshot.from_rows(columns, [], checks=checks).version
+
+    def test_version_follows_the_schema(self):
+        first = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+        same = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+        changed = schema_registry.SchemaSnapshot.from_rows(COLUMNS[:-2], CONSTRAINTS)
+
+        assert first.version == same.version
+        assert first.version != changed.version
+
+    @pytest.mark.parametrize("query,tables", [
+        ("show all employees in AAP", ["employees", "departments"]),
+        ("appointments for Artem", ["employees", "appointments"]),
+        ("who earns the highest salary", ["employees", "departments"]),
+        ("what's going on", ["employees", "departments", "appointments"]),
+    ])
+    def test_relevant_tables(self, query, tables):
+        schema = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+
+        assert schema.relevant_tables(query) == tables
+
+@pytest.mark.unit
+class TestSchemaRegistry:
+    """Unit tests for cached introspection with fingerprint checks"""
+
+    def setup_method(self):
+        schema_registry.clear()
+
+    def teardown_method(self):
+        schema_registry.clear()
+
+    def _connection(self, fingerprints):
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [(fingerprint,) for fingerprint in fingerprints]
+        cursor.fetchall.side_effect = [COLUMNS, CONSTRAINTS, CHECKS, COMMENTS] * len(fingerprints)
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        connection = MagicMock()
+        connection.return_value.__enter__.return_value = conn
+        return connection, cursor
+
+    def test_introspects_once_until_the_fingerprint_changes(self):
+        connection, cursor = self._connection(["a", "a", "b"])
+
+        with patch.object(schema_registry, "connection", connection), \
+                patch.object(schema_registry, "SCHEMA_CHECK_SECONDS", 0):
+            first = schema_registry.get()
+            second = schema_registry.get()
+            third = schema_registry.get()
+
+        assert first is second
+        assert third is not first
+        assert cursor.fetchall.call_count == 8
+
+    def test_cached_between_checks(self):
+        connection, cursor = self._connection(["a"])
+
+        with patch.object(schema_registry, "connection", connection):
+            assert schema_registry.get() is schema_registry.get()
+
+        assert cursor.execute.call_count == 5
+
+@pytest.mark.integration
+class TestSchemaEndpoint:
+    """Endpoint tests for the cached, ETag-enabled schema endpoint"""
+
+    def test_returns_schema_with_etag_and_304_on_match(self, client):
+        schema = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+        with patch.object(schema_registry, "get", return_value=schema):
+            response = client.get("/api/nl-query/schema")
+            etag = response.headers["etag"]
+            revalidated = client.get("/api/nl-query/schema", headers={"If-None-Match": etag})
+            weak = client.get("/api/nl-query/schema", headers={"If-None-Match": f'"other", W/{etag}'})
+
+        assert response.status_code == 200
+        assert etag == f'"{schema.version}"'
+        assert response.json()["tables"]["departments"][1] == {"column_name": "name", "data_type": "character varying", "is_nullable": "YES"}
+        assert revalidated.status_code == 304
+        assert weak.status_code == 304
+
+    def test_changed_schema_gets_a_new_etag(self, client):
+        old = schema_registry.SchemaSnapshot.from_rows(COLUMNS, CONSTRAINTS)
+        new = schema_registry.SchemaSnapshot.from_rows(COLUMNS[:-2], CONSTRAINTS)
+        with patch.object(schema_registry, "get", return_value=new):
+            response = client.get("/api/nl-query/schema", headers={"If-None-Match": f'"{old.version}"'})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{new.version}"'
@@ -0,0 +1,127 @@
+import pytest
+from unittest.mock import MagicMock
+
+from services import sql_guard, sql_validator
+
+@pytest.mark.unit
+class TestSQLValidator:
+    """Unit tests for the tokenizer-based SQL validator"""
+
+    @pytest.mark.parametrize("sql,tables", [
+        ('SELECT * FROM "employees";', ("employees",)),
+        ("SELECT e.name, d.name FROM employees e JOIN departments d ON e.dept_id = d.id", ("employees", "departments")),
+        ("SELECT * FROM employees, departments WHERE employees.dept_id = departments.id", ("employees", "departments")),
+        ("SELECT EXTRACT(YEAR FROM start_date) AS year FROM reservations", ("reservations",)),
+        ("SELECT * FROM public.employees e WHERE EXISTS (SELECT 1 FROM appointments a WHERE a.employee_id = e.id)", ("public.employees", "appointments")),
+        ("WITH aap AS (SELECT id FROM departments WHERE name = 'AAP') SELECT * FROM employees WHERE dept_id IN (SELECT id FROM aap)", ("departments", "employees", "aap")),
+        ("SELECT * FROM employees e JOIN (departments d JOIN reservations r ON true) ON e.dept_id = d.id", ("employees", "departments", "reservations")),
+        ("SELECT * FROM (VALUES (1), (2)) AS v(n)", ()),
+    ])
+    def test_accepts_read_only_selects(self, sql, tables):
+        analysis = sql_validator.analyze(sql)
+
+        assert analysis.ok, analysis.error
+        assert analysis.read_only
+        assert analysis.tables == tables
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT name AS dropped_name, 'alter ego' AS note FROM employees",
+        "SELECT 'a; b' AS text FROM employees",
+        "SELECT * FROM employees -- ; DROP TABLE employees\n",
+        'SELECT "update" FROM employees',
+        "SELECT e.name AS copy FROM employees e",
+        "SELECT lock, name AS into FROM employees",
+        "SELECT * FROM hiring_personal WHERE name = 'C:\\path'",
+        "SELECT * FROM employees WHERE name = E'it\\'s'",
+    ])
+    def test_keywords_in_names_and_literals_are_fine(self, sql):
+        assert sql_validator.analyze(sql).ok
+
+    @pytest.mark.parametrize("sql,error", [
+        ("SELECT * FROM employees; DROP TABLE employees;", "Multiple SQL statements"),
+        ("DELETE FROM employees", "Only SELECT"),
+        ("SELECT * INTO backup FROM employees", "'into'"),
+        ("SELECT * FROM employees FOR UPDATE", "'update'"),
+        ("SELECT pg_sleep(10)", "'pg_sleep'"),
+        ("SELECT \"pg_read_file\"('/etc/passwd')", "'pg_read_file'"),
+        ("SELECT \"pg_ls_dir\"('.')", "'pg_ls_dir'"),
+        ("SELECT pg_catalog.\"pg_sleep\"(10)", "'pg_sleep'"),
+        ("WITH gone AS (DELETE FROM employees RETURNING id) SELECT * FROM gone", "'delete'"),
+        ("SELECT * FROM employees FOR SHARE", "'share'"),
+        ("SELECT * FROM information_schema.columns", "not allowed"),
+        ("SELECT * FROM (SELECT * FROM secrets) s", "'secrets'"),
+        ("SELECT * FROM (pg_user) u", "'pg_user'"),
+        ("SELECT * FROM employees JOIN (pg_user u CROSS JOIN departments d) ON true", "'pg_user'"),
+        ("SELECT * FROM ((pg_authid)) a", "'pg_authid'"),
+    ])
+    def test_rejects_writes_and_unknown_tables(self, sql, error):
+        analysis = sql_validator.analyze(sql)
+
+        assert not analysis.ok
+        assert error in analysis.error
+
+    def test_results_are_cached(self):
+        sql_validator.analyze.cache_clear()
+        sql_validator.analyze("SELECT * FROM employees")
+        sql_validator.analyze("SELECT * FROM employees")
+
+        assert sql_validator.analyze.cache_info().hits == 1
+
+@pytest.mark.unit
+class TestSQLGuard:
+    """Unit tests for the execution guard around LLM-generated SQL"""
+
+    def setup_method(self):
+        sql_guard.reset_stats()
+
+    def _cursor(self, cost, rows):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ([{"Plan": {"Total Cost": cost, "Plan Rows": rows}}],)
+        return cursor
+
+    @pytest.mark.parametrize("sql,expected", [
+        ("SELECT * FROM employees;", "SELECT * FROM employees\nLIMIT 50"),
+        ('SELECT * FROM "employees" -- every employee', 'SELECT * FROM "employees" -- every employee\nLIMIT 50'),
+        ("SELECT * FROM employees; -- done; really", "SELECT * FROM employees\nLIMIT 50"),
+        ("SELECT ';' AS x FROM employees", "SELECT ';' AS x FROM employees\nLIMIT 50"),
+        ("SELECT * FROM employees LIMIT 5", "SELECT * FROM employees LIMIT 5"),
+        ("SELECT * FROM employees FETCH FIRST 5 ROWS ONLY", "SELECT * FROM employees FETCH FIRST 5 ROWS ONLY"),
+        ("SELECT * FROM (SELECT * FROM employees LIMIT 5) e", "SELECT * FROM (SELECT * FROM employees LIMIT 5) e\nLIMIT 50"),
+    ])
+    def test_default_limit(self, sql, expected):
+        assert sql_guard.with_limit(sql, 50) == expected
+
+    def test_runs_read_only_with_timeout_and_allows_cheap_plans(self):
+        cursor = self._cursor(cost=120.5, rows=40)
+
+        sql_guard.guard(cursor, "SELECT * FROM employees LIMIT 50")
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert statements[0].startswith("SET TRANSACTION READ ONLY; SET LOCAL statement_timeout")
+        assert statements[1] == "EXPLAIN (FORMAT JSON) SELECT * FROM employees LIMIT 50"
+        assert sql_guard.stats()["checked"] == 1
+
+    def test_rejects_expensive_plans(self):
+        cursor = self._cursor(cost=sql_guard.NL_QUERY_MAX_PLAN_COST * 10, rows=40)
+
+        with pytest.raises(sql_guard.QueryRejected):
+            sql_guard.guard(cursor, "SELECT * FROM reservations, appointments")
+
+        assert sql_guard.stats()["rejected_cost"] == 1
+
+    def test_rejects_huge_row_estimates(self):
+        cursor = self._cursor(cost=1.0, rows=sql_guard.NL_QUERY_MAX_PLAN_ROWS * 10)
+
+        with pytest.raises(sql_guard.QueryRejected):
+            sql_guard.guard(cursor, "SELECT * FROM reservations, appointments")
+
+        assert sql_guard.stats()["rejected_rows"] == 1
+
+    def test_counts_statement_timeouts(self):
+        import psycopg2.errors
+
+        with pytest.raises(sql_guard.QueryTimeout):
+            with sql_guard.statement_timeouts():
+                raise psycopg2.errors.QueryCanceled()
+
+        assert sql_guard.stats()["timed_out"] == 1
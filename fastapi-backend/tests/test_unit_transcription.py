@@ -0,0 +1,253 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from services import transcription
+
+@pytest.mark.unit
+class TestWhisperModelRegistry:
+    """Unit tests for the shared, lazily loaded Whisper model"""
+
+    def setup_method(self):
+        transcription._models.clear()
+        transcription._load_times.clear()
+        transcription._worker_load_times.clear()
+
+    def test_model_is_loaded_once_and_shared(self):
+        with patch("whisper.load_model", return_value=MagicMock()) as load_model:
+            first = transcription.get_model()
+            second = transcription.get_model()
+
+        assert first is second
+        load_model.assert_called_once_with(transcription.WHISPER_MODEL)
+        assert transcription.stats()["loaded"] is True
+        assert transcription.stats()["load_time_seconds"] is not None
+
+    def test_not_loaded_until_first_use(self):
+        assert transcription.stats()["loaded"] is False
+        assert transcription.stats()["load_time_seconds"] is None
+
+@pytest.mark.unit
+class TestTranscriptionQueue:
+    """Unit tests for the queued transcription worker pool (run in-process)"""
+
+    def setup_method(self):
+        transcription.shutdown()
+
+    def teardown_method(self):
+        transcription.shutdown()
+
+    def test_transcribe_runs_job_and_returns_result(self):
+        with patch.object(transcription, "WHISPER_WORKERS", 0), \
+                patch.object(transcription, "transcribe_batch", return_value=[("show all employees", "en")]) as transcribe_batch:
+            result = asyncio.run(transcription.transcribe(b"RIFF"))
+
+        assert result == ("show all employees", "en")
+        transcribe_batch.assert_called_once_with([b"RIFF"])
+
+    def test_worker_load_time_is_reported(self):
+        with patch.object(transcription, "WHISPER_WORKERS", 0), \
+                patch.object(transcription, "_run_batch", return_value=(4242, 3.2, [("hi", "en")])):
+            asyncio.run(transcription.transcribe(b"RIFF"))
+            stats = transcription.stats()
+
+        assert stats["loaded"] is True
+        assert stats["load_time_seconds"] == 3.2
+        assert stats["workers_loaded"] == 1
+
+    def test_rejects_when_queue_is_full(self):
+        release = threading.Event()
+
+        def slow_transcribe(items):
+            release.wait(5)
+            return [(data.decode(), "en") for data in items]
+
+        async def run():
+            first = asyncio.ensure_future(transcription.transcribe(b"a"))
+            await asyncio.sleep(0.05)  # let the dispatcher pick up the first job
+            second = asyncio.ensure_future(transcription.transcribe(b"b"))
+            await asyncio.sleep(0)
+            with pytest.raises(transcription.TranscriptionQueueFull):
+                await transcription.transcribe(b"c")
+            release.set()
+            return await first, await second
+
+        with patch.object(transcription, "WHISPER_WORKERS", 0), \
+                patch.object(transcription, "WHISPER_QUEUE_SIZE", 1), \
+                patch.object(transcription, "transcribe_batch", side_effect=slow_transcribe):
+            assert asyncio.run(run()) == (("a", "en"), ("b", "en"))
+
+    def test_queued_requests_are_batched(self):
+        async def run():
+            return await asyncio.gather(*(transcription.transcribe(data) for data in (b"a", b"b", b"c")))
+
+        results = [("a", "en"), ValueError("bad audio"), ("c", "en")]
+        with patch.object(transcription, "WHISPER_WORKERS", 0), \
+                patch.object(transcription, "transcribe_batch", return_value=results) as transcribe_batch:
+            with pytest.raises(ValueError):
+                asyncio.run(run())
+
+        transcribe_batch.assert_called_once_with([b"a", b"b", b"c"])
+
+@pytest.mark.unit
+class TestAudioInput:
+    """Unit tests for size-capped uploads and in-memory audio decoding"""
+
+    def _wav(self, samples, rate=transcription.SAMPLE_RATE, channels=1):
+        import io
+        import wave
+
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(samples.tobytes())
+        return buf.getvalue()
+
+    def test_read_upload_reads_in_chunks(self):
+        upload = MagicMock()
+        upload.read = AsyncMock(side_effect=[b"ab", b"cd", b""])
+
+        assert asyncio.run(transcription.read_upload(upload, max_bytes=10)) == b"abcd"
+        upload.read.assert_called_with(transcription.UPLOAD_CHUNK_BYTES)
+
+    def test_read_upload_rejects_oversized_body(self):
+        upload = MagicMock()
+        upload.read = AsyncMock(side_effect=[b"abcd", b"efgh", b""])
+
+        with pytest.raises(transcription.AudioTooLarge):
+            asyncio.run(transcription.read_upload(upload, max_bytes=6))
+
+    def test_decodes_pcm_wav_without_ffmpeg(self):
+        np = pytest.importorskip("numpy")
+        samples = np.array([0, 16384, -16384], dtype=np.int16)
+
+        with patch("subprocess.run") as run:
+            audio = transcription.decode_audio(self._wav(samples))
+
+        run.assert_not_called()
+        assert audio.dtype == np.float32
+        assert audio.tolist() == [0.0, 0.5, -0.5]
+
+    def test_downmixes_stereo_wav(self):
+        np = pytest.importorskip("numpy")
+        samples = np.array([16384, 0, -16384, -16384], dtype=np.int16)
+
+        audio = transcription.decode_audio(self._wav(samples, channels=2))
+
+        assert audio.tolist() == [0.25, -0.5]
+
+    def test_other_formats_are_piped_through_ffmpeg(self):
+        np = pytest.importorskip("numpy")
+        pcm = np.array([16384], dtype=np.int16).tobytes()
+
+        with patch("subprocess.run", return_value=MagicMock(stdout=pcm)) as run:
+            audio = transcription.decode_audio(b"ID3-not-a-wav")
+
+        assert run.call_args.kwargs["input"] == b"ID3-not-a-wav"
+        assert "pipe:0" in run.call_args.args[0]
+        assert audio.tolist() == [0.5]
+
+@pytest.mark.unit
+class TestChunking:
+    """Unit tests for silence trimming and window splitting"""
+
+    def test_trim_silence_keeps_speech_with_margin(self):
+        np = pytest.importorskip("numpy")
+        sr = transcription.SAMPLE_RATE
+        audio = np.zeros(3 * sr, dtype=np.float32)
+        audio[sr:2 * sr] = 0.5
+
+        trimmed = transcription.trim_silence(audio)
+
+        assert len(trimmed) == sr + 2 * transcription.SILENCE_PADDING_SAMPLES
+        assert trimmed.max() == 0.5
+
+    def test_trim_silence_returns_empty_for_silence(self):
+        np = pytest.importorskip("numpy")
+
+        assert len(transcription.trim_silence(np.zeros(transcription.SAMPLE_RATE, dtype=np.float32))) == 0
+
+    def test_short_audio_is_a_single_window(self):
+        np = pytest.importorskip("numpy")
+        audio = np.ones(2 * transcription.SAMPLE_RATE, dtype=np.float32)
+
+        windows = transcription.split_windows(audio)
+
+        assert len(windows) == 1
+        assert len(windows[0]) == len(audio)
+
+    def test_long_audio_is_split_at_a_quiet_spot(self):
+        np = pytest.importorskip("numpy")
+        sr = transcription.SAMPLE_RATE
+        audio = np.full(70 * sr, 0.5, dtype=np.float32)
+        quiet = 29 * sr
+        audio[quiet:quiet + transcription.FRAME_SAMPLES] = 0.0
+
+        windows = transcription.split_windows(audio)
+
+        assert len(windows) == 3
+        assert len(windows[0]) == quiet + transcription.FRAME_SAMPLES
+        assert all(len(w) <= transcription.WINDOW_SAMPLES for w in windows)
+        assert sum(len(w) for w in windows) == len(audio)
+
+@pytest.mark.unit
+class TestTranscribeBatch:
+    """Unit tests for batched decoding with the model mocked"""
+
+    def _run(self, items, language=None):
+        np = pytest.importorskip("numpy")
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("whisper")
+
+        model = MagicMock(device="cpu")
+        model.detect_language.side_effect = lambda mel: (None, [{"en": 0.9, "uk": 0.1}] * len(mel))
+        decode = MagicMock(side_effect=lambda m, mel, options: [MagicMock(text=" hi ") for _ in range(len(mel))])
+        audio = {b"speech": np.full(transcription.SAMPLE_RATE, 0.5, dtype=np.float32),
+                 b"silence": np.zeros(transcription.SAMPLE_RATE, dtype=np.float32)}
+
+        with patch.object(transcription, "WHISPER_LANGUAGE", language), \
+                patch.object(transcription, "get_model", return_value=model), \
+                patch.object(transcription, "decode_audio", side_effect=audio.__getitem__), \
+                patch("whisper.log_mel_spectrogram", return_value=torch.zeros(80, 3000)), \
+                patch("whisper.decode", decode):
+            return transcription.transcribe_batch(items), model, decode
+
+    def test_uploads_share_detection_and_decode_calls(self):
+        results, model, decode = self._run([b"speech", b"silence", b"speech"])
+
+        assert results == [("hi", "en"), ("", None), ("hi", "en")]
+        model.detect_language.assert_called_once()
+        decode.assert_called_once()
+
+    def test_fixed_language_skips_detection(self):
+        results, model, decode = self._run([b"speech"], language="uk")
+
+        assert results == [("hi", "uk")]
+        model.detect_language.assert_not_called()
+        assert decode.call_args.args[2].language == "uk"
+
+    def test_fp16_follows_the_model_device(self):
+        _, _, decode = self._run([b"speech"])
+
+        assert decode.call_args.args[2].fp16 is False
+        assert transcription.use_fp16(MagicMock(device="cuda:0"))
+
+@pytest.mark.integration
+class TestTranscriptionEndpoints:
+    """Endpoint tests with the transcription queue mocked"""
+
+    def test_queue_full_returns_429(self, client):
+        full = AsyncMock(side_effect=transcription.TranscriptionQueueFull("Transcription queue is full"))
+        with patch.object(transcription, "transcribe", full):
+            response = client.post("/transcribe/", files={"file": ("query.wav", b"RIFF", "audio/wav")})
+
+        assert response.status_code == 429
+
+    def test_oversized_upload_returns_413(self, client):
+        with patch.object(transcription, "WHISPER_MAX_UPLOAD_BYTES", 4):
+            response = client.post("/transcribe/", files={"file": ("query.wav", b"RIFF-too-long", "audio/wav")})
+
+        assert response.status_code == 413
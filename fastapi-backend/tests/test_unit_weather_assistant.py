@@ -0,0 +1,178 @@
+import asyncio
+import json
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch, AsyncMock
+
+from fastapi import HTTPException
+from models.forecast import ForecastIndex
+from routers import weather_assistant
+from services import forecast_cache, recommendation_cache
+from tests.mocks.weather_responses import forecast_response
+
+@pytest.mark.unit
+class TestForecastIndex:
+    """Unit tests for the parsed, date-indexed forecast"""
+
+    def test_groups_slots_by_day_with_aggregates(self):
+        data = forecast_response(datetime(2024, 5, 1, 0), [10, 12, 14, 16, 18, 15, 12, 11, 9], rain=0.5)
+        index = ForecastIndex.from_openweathermap(data)
+
+        day = index.day(date(2024, 5, 1))
+        assert len(day.slots) == 8
+        assert day.temp_min == 10
+        assert day.temp_max == 18
+        assert day.temp_mean == 13.5
+        assert day.precipitation_total == 4.0
+        assert index.day(date(2024, 5, 2)).temp_max == 9
+        assert index.day(date(2024, 5, 3)) is None
+
+    def test_closest_to_noon(self):
+        data = forecast_response(datetime(2024, 5, 1, 0), [10, 12, 14, 16, 18, 15, 12, 11])
+        day = ForecastIndex.from_openweathermap(data).day(date(2024, 5, 1))
+
+        assert day.closest_to(12).hour == 12
+        assert day.closest_to(12).temperature == 18
+        assert day.closest_to(20).temperature == 11
+
+@pytest.mark.unit
+class TestGetWeatherForecast:
+    """Unit tests for get_weather_forecast with a mocked upstream"""
+
+    def setup_method(self):
+        forecast_cache.clear()
+
+    def test_returns_noon_slot_and_daily_range(self):
+        data = forecast_response(datetime(2024, 5, 1, 0), [10, 12, 14, 16, 18, 15, 12, 11], conditions="Rain")
+        with patch.object(weather_assistant.http_client, "get_json", AsyncMock(return_value=data)) as get_json:
+            weather = asyncio.run(weather_assistant.get_weather_forecast("London, UK", "2024-05-01"))
+            asyncio.run(weather_assistant.get_weather_forecast("london, uk", "2024-05-01"))
+
+        assert weather["temperature"] == 18
+        assert weather["conditions"] == "Rain"
+        assert weather["temp_min"] == 10
+        assert weather["temp_max"] == 18
+        assert weather["summary"] == "Rain with temperature of 18°C"
+        get_json.assert_awaited_once()
+
+    def test_date_outside_forecast_range(self):
+        data = forecast_response(datetime(2024, 5, 1, 0), [10, 12])
+        with patch.object(weather_assistant.http_client, "get_json", AsyncMock(return_value=data)):
+            with pytest.raises(HTTPException) as exc_info:
+                asyncio.run(weather_assistant.get_weather_forecast("London, UK", "2024-05-09"))
+
+        assert exc_info.value.status_code == 400
+
+@pytest.mark.unit
+class TestRecommendationCache:
+    """Unit tests for the content-addressed recommendation cache"""
+
+    weather = {"temperature": 15.5, "feels_like": 14.0, "conditions": "Clouds", "description": "overcast clouds", "wind_speed": 3}
+    clothes = {"tops": [{"id": 1, "type": "t-shirt", "warmth": "light"}]}
+
+    def setup_method(self):
+        recommendation_cache.clear()
+
+    def test_key_quantizes_weather(self):
+        key = recommendation_cache.recommendation_key(self.weather, self.clothes, "Office", None)
+
+        similar = dict(self.weather, feels_like=13.2, wind_speed=2)
+        assert recommendation_cache.recommendation_key(similar, self.clothes, " office ", "") == key
+
+        colder = dict(self.weather, feels_like=5.0)
+        assert recommendation_cache.recommendation_key(colder, self.clothes, "Office", None) != key
+        other_inventory = {"tops": [{"id": 2, "type": "coat", "warmth": "heavy"}]}
+        assert recommendation_cache.recommendation_key(self.weather, other_inventory, "Office", None) != key
+
+    def test_identical_inputs_call_llm_once(self):
+        answer = '{"summary": "Wear layers", "outfit": {}, "tips": []}'
+        with patch.object(weather_assistant.llm, "chat", AsyncMock(return_value=answer)) as chat:
+            first = asyncio.run(weather_assistant.get_clothing_recommendations(self.weather, self.clothes, "Office"))
+            second = asyncio.run(weather_assistant.get_clothing_recommendations(self.weather, self.clothes, "office"))
+
+        assert first == second == {"summary": "Wear layers", "outfit": {}, "tips": []}
+        assert chat.await_count == 1
+        assert recommendation_cache.stats()["hits"] == 1
+
+    def test_llm_failure_falls_back_to_rules_and_is_not_cached(self):
+        with patch.object(weather_assistant.llm, "chat", AsyncMock(side_effect=RuntimeError("rate limited"))) as chat:
+            result = asyncio.run(weather_assistant.get_clothing_recommendations(self.weather, self.clothes))
+            asyncio.run(weather_assistant.get_clothing_recommendations(self.weather, self.clothes))
+
+        assert result["source"] == "rules"
+        assert result["outfit"]["top"] == [1, "T-shirt"]
+        assert chat.await_count == 2
+
+@pytest.mark.integration
+class TestDressRecommendationEndpoint:
+    """Endpoint tests with mocked weather and database"""
+
+    def test_fast_mode_skips_llm(self, client, mock_weather_db, mock_weather_forecast):
+        with patch.object(weather_assistant.llm, "chat", AsyncMock()) as chat:
+            response = client.post("/api/weather-assistant/dress-recommendation", json={
+                "user_id": 1, "location": "London, UK", "date": "2024-05-01", "mode": "fast"
+            })
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["conditions"] == "Cloudy"
+        assert body["recommendations"]["source"] == "rules"
+        assert body["recommendations"]["outfit"]["top"][1] == "Gray sweater"
+        chat.assert_not_awaited()
+
+    def test_stream_emits_weather_tokens_and_result(self, client, mock_weather_db, mock_weather_forecast):
+        recommendation_cache.clear()
+
+        async def chat_stream(*args, **kwargs):
+            for token in ['{"summary": "Layers", ', '"outfit": {}, "tips": []}']:
+                yield token
+
+        with patch.object(weather_assistant.llm, "chat_stream", chat_stream):
+            response = client.post("/api/weather-assistant/dress-recommendation/stream", json={
+                "user_id": 1, "location": "London, UK", "date": "2024-05-01"
+            })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n")[0].replace("event: ", "") for block in response.text.strip().split("\n\n")]
+        assert events == ["weather", "token", "token", "result"]
+        assert '"recommendations": {"summary": "Layers"' in response.text
+
+    def test_stream_reports_unexpected_errors_as_an_event(self, client, mock_weather_db):
+        with patch.object(weather_assistant, "get_weather_forecast", AsyncMock(side_effect=ValueError("bad date"))):
+            response = client.post("/api/weather-assistant/dress-recommendation/stream", json={
+                "user_id": 1, "location": "London, UK", "date": "2024-13-45"
+            })
+
+        assert response.status_code == 200
+        assert response.text == 'event: error\ndata: {"status_code": 500, "detail": "bad date"}\n\n'
+
+    def test_batch_groups_forecasts_and_identical_inputs(self, client, mock_weather_db):
+        recommendation_cache.clear()
+        forecast_cache.clear()
+        data = forecast_response(datetime(2024, 5, 1, 0), [10, 12, 14, 16, 18, 15, 12, 11])
+        batch = [
+            {"user_id": 1, "location": "London, UK", "date": "2024-05-01", "occasion": "Office"},
+            {"user_id": 2, "location": "london,uk", "date": "2024-05-01", "occasion": "office"},
+            {"user_id": 3, "location": "London, UK", "date": "2024-05-01", "occasion": "Hiking"},
+            {"user_id": 4, "location": "London, UK", "date": "2030-01-01"},
+        ]
+        answer = '{"summary": "Layers", "outfit": {}, "tips": []}'
+        with patch.object(weather_assistant.http_client, "get_json", AsyncMock(return_value=data)) as get_json, \
+                patch.object(weather_assistant.llm, "chat", AsyncMock(return_value=answer)) as chat:
+            response = client.post("/api/weather-assistant/dress-recommendation/batch", json=batch)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        by_index = {line["index"]: line for line in lines}
+        assert sorted(by_index) == [0, 1, 2, 3]
+        assert "not available" in by_index[3]["error"]
+        assert by_index[0]["response"]["recommendations"]["summary"] == "Layers"
+        assert by_index[1]["response"]["location"] == "london,uk"
+        get_json.assert_awaited_once()
+        assert chat.await_count == 2
+        # One inventory query for every distinct user
+        inventory_queries = [call for call in mock_weather_db.cursor.return_value.execute.call_args_list if "ANY(%s)" in call.args[0]]
+        assert len(inventory_queries) == 1
+        assert sorted(inventory_queries[0].args[1][0]) == [1, 2, 3, 4]